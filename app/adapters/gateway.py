@@ -1,5 +1,5 @@
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from app.schemas import (
     User,
@@ -9,10 +9,16 @@ from app.errors import (
     UserNotFoundException,
     PasswordNotMatchedException,
     CorruptedTokenError,
-    EmptyDataError
+    EmptyDataError,
+    DBError
 )
 from app.adapters.gateway_i import GatewayInterface
+from app.infra.cache import TTLCache
+from app.infra.near_cache import NearCache
+from app.infra.repository import ACCESS, REFRESH
 from app.infra.repository_i import RepositoryInterface
+from app.infra.revocations import Revocations
+from app.metrics import TOKEN_VALIDATIONS
 
 from jose import JWTError
 
@@ -24,8 +30,17 @@ TOKEN_TYPE = "Bearer"
 class Gateway(GatewayInterface):
 
     repo: RepositoryInterface
+    user_cache: NearCache = field(
+        default_factory=lambda: NearCache(TTLCache("users"))
+    )
+    revocations: Revocations = field(default_factory=Revocations)
+    stateless: bool = False
+    access_ttl: float = 300.0
 
     async def authenticate_user(self, username: str, password: str) -> User:
+        if username in self.revocations:
+            log.error(f"User :{username} is revoked")
+            raise UserNotFoundException(f"User :{username} is revoked")
         user = await self.repo.get_user(username)
         if not user:
             log.error(f"User :{username} not exists")
@@ -43,24 +58,86 @@ class Gateway(GatewayInterface):
             raise PasswordNotMatchedException(
                 f"Password for user {username} not match"
             )
+        await self.user_cache.set(username, True)
         return user_m
 
     async def create_acces_token(self, user_data: User) -> Token:
-        token = await self.repo.create_acces_token(
-            user_data.username
+        if not self.stateless:
+            token = await self.repo.create_acces_token(
+                user_data.username
+            )
+            return Token(access_token=token, token_type=TOKEN_TYPE)
+        return await self.issue_access_token(
+            user_data.username,
+            await self.repo.create_refresh_token(user_data.username)
         )
-        return Token(access_token=token, token_type=TOKEN_TYPE)
+
+    async def refresh_access_token(self, refresh_token: str) -> Token:
+        username = await self.decode_username(refresh_token, REFRESH)
+        if not self.trusts_claims():
+            await self.check_user(username)
+        return await self.issue_access_token(username, refresh_token)
 
     async def validate_user_token(self, user_token: str):
+        username = await self.decode_username(user_token, ACCESS)
+        if self.trusts_claims():
+            TOKEN_VALIDATIONS.labels("stateless").inc()
+            return username
+        TOKEN_VALIDATIONS.labels("database").inc()
+        return await self.check_user(username)
+
+    async def issue_access_token(
+        self,
+        username: str,
+        refresh_token: str
+    ) -> Token:
+        token = await self.repo.create_acces_token(
+            username,
+            self.access_ttl
+        )
+        return Token(
+            access_token=token,
+            token_type=TOKEN_TYPE,
+            refresh_token=refresh_token,
+            expires_in=int(self.access_ttl)
+        )
+
+    async def decode_username(self, user_token: str, kind: str) -> str:
         try:
             token_data = await self.repo.decode_token(user_token)
         except JWTError:
             log.error("Corrupted token data")
             raise CorruptedTokenError("Problems to decode token")
+        if token_data.get("type", ACCESS) != kind:
+            log.error(f"Expected {kind} token")
+            raise CorruptedTokenError(f"Expected {kind} token")
         username = token_data.get("sub")
         if username is None:
             raise EmptyDataError("Username is empty from decoded token")
-        user = await self.repo.get_user(username)
+        if username in self.revocations:
+            log.error(f"User :{username} is revoked")
+            raise UserNotFoundException(f"User :{username} is revoked")
+        return username
+
+    def trusts_claims(self) -> bool:
+        """Stateless mode skips the database while revocations are fresh"""
+        return self.stateless and self.revocations.is_fresh()
+
+    async def check_user(self, username: str) -> str:
+        if await self.user_cache.get(username):
+            return username
+        try:
+            user = await self.repo.get_user(username)
+        except DBError:
+            if self.user_cache.get_stale(username):
+                log.warning(f"Using cached user {username}, DB unavailable")
+                return username
+            raise
         if not user:
             log.error(f"User: {username} from token not exists")
             raise UserNotFoundException(f"User :{username} not exists")
+        await self.user_cache.set(username, True)
+        return username
+
+    async def invalidate_user(self, username: str):
+        await self.user_cache.invalidate(username)
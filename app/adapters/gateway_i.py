@@ -28,10 +28,31 @@ class GatewayInterface(ABC):
         """
 
     @abstractmethod
-    async def validate_user_token(self, user_token: str):
+    async def refresh_access_token(self, refresh_token: str) -> Any:
+        """Issue a new access token from a refresh token, without a login
+
+        Args:
+            refresh_token (str): refresh token returned by the login
+
+        Returns:
+            Token: new access token along with the same refresh token
+        """
+
+    @abstractmethod
+    async def validate_user_token(self, user_token: str) -> str:
         """Validate token from user
 
         Args:
             user_token (str): user to validate
 
+        Returns:
+            str: username owning the token
+        """
+
+    @abstractmethod
+    async def invalidate_user(self, username: str):
+        """Drop a user from the authenticated users cache of every replica
+
+        Args:
+            username (str): user to invalidate
         """
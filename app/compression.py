@@ -0,0 +1,277 @@
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from app.config import get_settings
+from app.metrics import (
+    COMPRESSION_CPU,
+    COMPRESSION_RESPONSES,
+    COMPRESSION_SAVED,
+)
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+conf = get_settings()
+
+GZIP = "gzip"
+BROTLI = "br"
+ENCODINGS = (BROTLI, GZIP) if brotli is not None else (GZIP,)
+COMPRESSIBLE = (
+    "application/json",
+    "application/javascript",
+    "image/svg+xml",
+    "text/",
+)
+UNCOMPRESSED = (204, 206, 304)
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> Dict[str, float]:
+    """Quality of each coding listed in an ``Accept-Encoding`` header"""
+    qualities: Dict[str, float] = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        name, _, value = params.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def negotiate(
+    accept_encoding: Optional[str],
+    encodings: Tuple[str, ...] = ENCODINGS
+) -> Optional[str]:
+    """Best coding both sides support, ties go to the first of ``encodings``"""
+    qualities = accepted_encodings(accept_encoding)
+    best: Optional[str] = None
+    best_quality = 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def is_compressible(media_type: Optional[str]) -> bool:
+    return bool(media_type) and media_type.startswith(COMPRESSIBLE)
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """Validator of the ``encoding`` coded representation of ``etag``
+
+    Each coding is a different representation, so a strong ETag gets the
+    coding as suffix (``"abc"`` becomes ``"abc-gzip"``).
+    """
+    if not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def route_label(scope: Scope) -> str:
+    return getattr(scope.get("route"), "path", "unmatched")
+
+
+class Compressor:
+    """Incremental encoder, accounting the CPU time it spends per route"""
+
+    def __init__(self, encoding: str, route: str):
+        self.encoding = encoding
+        self.route = route
+        if encoding == BROTLI:
+            self.encoder = brotli.Compressor(quality=conf.brotli_quality)
+        else:
+            self.encoder = zlib.compressobj(
+                conf.compression_level,
+                zlib.DEFLATED,
+                16 + zlib.MAX_WBITS
+            )
+
+    def compress(self, data: bytes) -> bytes:
+        started_at = time.thread_time()
+        if self.encoding == BROTLI:
+            compressed = self.encoder.process(data)
+        else:
+            compressed = self.encoder.compress(data)
+        self._account(started_at)
+        return compressed
+
+    def flush(self) -> bytes:
+        started_at = time.thread_time()
+        if self.encoding == BROTLI:
+            compressed = self.encoder.finish()
+        else:
+            compressed = self.encoder.flush()
+        self._account(started_at)
+        return compressed
+
+    def _account(self, started_at: float):
+        COMPRESSION_CPU.labels(self.route, self.encoding).inc(
+            time.thread_time() - started_at
+        )
+
+
+def compress(data: bytes, encoding: str, route: str) -> bytes:
+    compressor = Compressor(encoding, route)
+    return compressor.compress(data) + compressor.flush()
+
+
+def record(route: str, encoding: str, size: int, compressed_size: int):
+    COMPRESSION_SAVED.labels(route, encoding).inc(size - compressed_size)
+
+
+def choose_encoding(
+    accept_encoding: Optional[str],
+    media_type: Optional[str],
+    size: int
+) -> Optional[str]:
+    """Coding to compress a whole body with, None to send it as is"""
+    if (
+        not conf.compression_enabled
+        or size < conf.compression_minimum_size
+        or not is_compressible(media_type)
+    ):
+        return None
+    return negotiate(accept_encoding)
+
+
+class CompressionMiddleware:
+    """Compress responses with the best coding the client accepts
+
+    Bodies smaller than ``compression_minimum_size`` are sent as they are,
+    streamed bodies are buffered up to that size to decide. Responses
+    that already carry a ``Content-Encoding``, like compressed upstream
+    bodies relayed by the proxy, pass through untouched.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = CompressionResponder(scope, send, encoding)
+        await self.app(scope, receive, responder.send)
+
+
+class CompressionResponder:
+
+    def __init__(self, scope: Scope, send: Send, encoding: str):
+        self.scope = scope
+        self.downstream = send
+        self.encoding = encoding
+        self.start: Optional[Message] = None
+        self.pending: List[bytes] = []
+        self.pending_size = 0
+        self.size = 0
+        self.compressed_size = 0
+        self.compressor: Optional[Compressor] = None
+        self.passthrough = False
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = (
+                message["status"] in UNCOMPRESSED
+                or "content-encoding" in headers
+                or not is_compressible(headers.get("content-type"))
+            )
+            if self.passthrough:
+                if "content-encoding" in headers:
+                    COMPRESSION_RESPONSES.labels(
+                        route_label(self.scope),
+                        "passthrough"
+                    ).inc()
+                await self.downstream(message)
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.downstream(message)
+            return
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is not None:
+            await self.send_compressed(body, more_body)
+            return
+        self.pending.append(body)
+        self.pending_size += len(body)
+        if more_body and self.pending_size < conf.compression_minimum_size:
+            return
+        body, self.pending = b"".join(self.pending), []
+        if not more_body and len(body) < conf.compression_minimum_size:
+            COMPRESSION_RESPONSES.labels(
+                route_label(self.scope),
+                "small"
+            ).inc()
+            await self.downstream(self.start)
+            await self.downstream({
+                "type": "http.response.body",
+                "body": body,
+                "more_body": False,
+            })
+            return
+        self.compressor = Compressor(self.encoding, route_label(self.scope))
+        COMPRESSION_RESPONSES.labels(self.compressor.route, "compressed").inc()
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if "etag" in headers:
+            headers["ETag"] = encoded_etag(headers["etag"], self.encoding)
+        del headers["Content-Length"]
+        if not more_body:
+            compressed = self.compressor.compress(body)
+            compressed += self.compressor.flush()
+            headers["Content-Length"] = str(len(compressed))
+            record(
+                self.compressor.route,
+                self.encoding,
+                len(body),
+                len(compressed)
+            )
+            await self.downstream(self.start)
+            await self.downstream({
+                "type": "http.response.body",
+                "body": compressed,
+                "more_body": False,
+            })
+            return
+        await self.downstream(self.start)
+        await self.send_compressed(body, more_body)
+
+    async def send_compressed(self, body: bytes, more_body: bool):
+        """Relay a streamed body, the last chunk also flushes the encoder"""
+        compressed = self.compressor.compress(body)
+        if not more_body:
+            compressed += self.compressor.flush()
+        self.size += len(body)
+        self.compressed_size += len(compressed)
+        if not more_body:
+            record(
+                self.compressor.route,
+                self.encoding,
+                self.size,
+                self.compressed_size
+            )
+        if compressed or not more_body:
+            await self.downstream({
+                "type": "http.response.body",
+                "body": compressed,
+                "more_body": more_body,
+            })
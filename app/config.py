@@ -1,4 +1,7 @@
 import logging
+from functools import lru_cache
+
+from typing import Dict, List, Optional
 
 from pydantic import BaseSettings
 
@@ -8,21 +11,114 @@ class Configuration(BaseSettings):
     port: int = 5000
     host: str = "0.0.0.0"
     log_level: str = "INFO"
+    workers: int = 1
+    backlog: int = 2048
+    keep_alive: int = 5
+    event_loop: str = "auto"
+    http_parser: str = "auto"
+    graceful_timeout: int = 30
+    drain_timeout: float = 10.0
     db_host: str
     db_user: str
     db_passwrd: str
     db_name: str
     collection: str
+    db_max_pool_size: int = 100
+    db_min_pool_size: int = 0
+    db_max_idle_time: float = 300.0
+    db_wait_queue_timeout: float = 2.0
+    db_server_selection_timeout: float = 5.0
+    db_connect_timeout: float = 5.0
+    db_socket_timeout: float = 10.0
+    db_read_preference: str = "primary"
+    db_ensure_indexes: bool = True
     secret_key: str
     algorithm:  str
     expire_time: int
+    auth_mode: str = "database"
+    access_token_ttl: float = 300.0
+    refresh_token_ttl: float = 604800.0
+    revocation_collection: str = "revoked_users"
+    revocation_sync_interval: float = 30.0
+    revocation_max_age: float = 120.0
     quoter_url: str
     client_url: str
     service_url: str
+    upstream_max_connections: int = 100
+    upstream_max_keepalive: int = 20
+    upstream_keepalive_expiry: float = 30.0
+    upstream_connect_timeout: float = 3.0
+    upstream_read_timeout: float = 10.0
+    upstream_pool_timeout: float = 5.0
+    upstream_max_in_flight: int = 50
+    upstream_bulkhead_wait: float = 0.5
+    upstream_policies: Dict[str, Dict[str, float]] = {}
+    breaker_failure_threshold: float = 0.5
+    breaker_min_requests: int = 20
+    breaker_window: float = 30.0
+    breaker_slow_call: float = 5.0
+    breaker_open_seconds: float = 15.0
+    hedge_percentile: float = 0.95
+    hedge_min_delay: float = 0.01
+    retry_backoff: float = 0.05
+    retry_backoff_max: float = 1.0
+    retry_budget_ratio: float = 0.1
+    retry_budget_capacity: float = 100.0
+    upstream_streaming: bool = True
+    upstream_coalescing: bool = True
+    fanout_concurrency: int = 10
+    batch_max_ids: int = 100
+    trust_upstream: bool = False
+    validation_sample_rate: float = 0.01
+    json_backend: str = "orjson"
+    forward_raw_bodies: bool = False
+    compression_enabled: bool = True
+    compression_minimum_size: int = 1024
+    compression_level: int = 6
+    brotli_quality: int = 4
+    upstream_accept_encoding: str = "gzip"
+    user_cache_size: int = 4096
+    user_cache_ttl: float = 60.0
+    user_cache_stale_ttl: float = 300.0
+    password_workers: int = 4
+    password_queue_limit: int = 64
+    token_cache_size: int = 10000
+    token_cache_ttl: float = 300.0
+    cache_url: Optional[str] = None
+    cache_timeout: float = 0.05
+    cache_pool_size: int = 8
+    cache_channel: str = "gateway:invalidations"
+    near_cache_ttl: float = 5.0
+    response_cache_size: int = 2048
+    response_cache_retention: float = 3600.0
+    catalog_index_enabled: bool = False
+    catalog_sync_interval: float = 300.0
+    catalog_max_age: float = 900.0
+    catalog_max_results: int = 50
+    catalog_products_url: str = "/api/v1/products?product_name="
+    catalog_services_url: str = "/api/v1/services?service_name="
+    profiling_enabled: bool = False
+    profiling_admins: List[str] = []
+    profiling_sample_rate: float = 0.0
+    profiling_interval: float = 0.005
+    profiling_keep: int = 20
+    profiling_max_window: float = 30.0
+    warmup_enabled: bool = False
+    warmup_connections: int = 4
+    upstream_probe_path: str = "/"
+    health_timeout: float = 2.0
+
+
+@lru_cache
+def get_settings() -> Configuration:
+    """Settings parsed once from the environment and shared by modules"""
+    return Configuration()
 
 
+@lru_cache
 def configure_logger():
-    conf = Configuration()
+    """Attach the gateway handler to the root logger, once per process"""
+    conf = get_settings()
     logger = logging.getLogger()
     logger.setLevel(conf.log_level)
     ch = logging.StreamHandler()
@@ -1,4 +1,5 @@
-from app.config import Configuration
+from app.config import get_settings
+from app.db.monitoring import PoolMonitor
 from app.errors import DBError
 
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -8,7 +9,11 @@ from pymongo.errors import (
     ConnectionFailure,
 )
 
-conf = Configuration()
+conf = get_settings()
+
+
+def milliseconds(seconds: float) -> int:
+    return int(seconds * 1000)
 
 
 def create_connection() -> AsyncIOMotorDatabase:
@@ -21,7 +26,20 @@ def create_connection() -> AsyncIOMotorDatabase:
     )
     database_name = conf.db_name
     try:
-        client = AsyncIOMotorClient(url_connection)
+        client = AsyncIOMotorClient(
+            url_connection,
+            maxPoolSize=conf.db_max_pool_size,
+            minPoolSize=conf.db_min_pool_size,
+            maxIdleTimeMS=milliseconds(conf.db_max_idle_time),
+            waitQueueTimeoutMS=milliseconds(conf.db_wait_queue_timeout),
+            serverSelectionTimeoutMS=milliseconds(
+                conf.db_server_selection_timeout
+            ),
+            connectTimeoutMS=milliseconds(conf.db_connect_timeout),
+            socketTimeoutMS=milliseconds(conf.db_socket_timeout),
+            readPreference=conf.db_read_preference,
+            event_listeners=[PoolMonitor()]
+        )
     except (ConfigurationError, ConnectionFailure) as e:
         raise DBError(
             f"Could not connect to database due to: {e}"
@@ -0,0 +1,65 @@
+import time
+import threading
+
+from app.metrics import (
+    MONGO_CONNECTIONS,
+    MONGO_CHECKED_OUT,
+    MONGO_POOL_WAIT,
+    MONGO_CHECKOUT_FAILURES,
+)
+
+from pymongo import monitoring
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Mirrors the Motor connection pool usage into gauges
+
+    Check outs run on Motor's executor threads and their started and
+    finished events fire on the same thread, so the wait is timed with a
+    thread local start.
+    """
+
+    def __init__(self):
+        self.waits = threading.local()
+
+    def waited(self) -> float:
+        started_at = getattr(self.waits, "started_at", None)
+        self.waits.started_at = None
+        if started_at is None:
+            return 0.0
+        return time.perf_counter() - started_at
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        MONGO_CONNECTIONS.inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_CONNECTIONS.dec()
+
+    def connection_check_out_started(self, event):
+        self.waits.started_at = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        self.waited()
+        MONGO_CHECKOUT_FAILURES.labels(event.reason).inc()
+
+    def connection_checked_out(self, event):
+        MONGO_POOL_WAIT.observe(self.waited())
+        MONGO_CHECKED_OUT.inc()
+
+    def connection_checked_in(self, event):
+        MONGO_CHECKED_OUT.dec()
@@ -1,11 +1,201 @@
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from app.config import get_settings
 from app.db.connections import create_connection
 from app.infra.repository import Repository
+from app.infra.catalog import Catalog
+from app.infra.revocations import Revocations
+from app.infra.hedging import Hedger, RetryBudget
+from app.infra.resilience import create_guards
+from app.infra.upstream import (
+    SERVICE,
+    UPSTREAMS,
+    create_upstream,
+    close_upstreams,
+)
+from app.infra.cache import TTLCache
+from app.infra.cache_backends import create_cache_backend
+from app.infra.near_cache import NearCache, listen_invalidations
+from app.infra.response_cache import (
+    ResponseCache,
+    encode_entry,
+    decode_entry,
+)
+from app.infra.singleflight import SingleFlight
 from app.adapters.gateway import Gateway
+from app.profiling import Profiler
+
+import httpx
+
+conf = get_settings()
+log = logging.getLogger(__name__)
+cache_backend = create_cache_backend(
+    conf.cache_url,
+    conf.cache_timeout,
+    conf.cache_pool_size
+)
+
 
-db_conn = create_connection()
-repo = Repository(nosql_conn=db_conn)
-gateway = Gateway(repo)
+def near_cache(local: TTLCache, **kwargs) -> NearCache:
+    return NearCache(
+        local,
+        backend=cache_backend,
+        channel=conf.cache_channel,
+        near_ttl=conf.near_cache_ttl,
+        **kwargs
+    )
+
+
+# Verified claims never go to the shared backend, whoever can write to
+# it could plant claims that skip the signature check.
+repo = Repository(
+    connect=create_connection,
+    token_cache=NearCache(TTLCache(
+        "tokens",
+        maxsize=conf.token_cache_size,
+        ttl=conf.token_cache_ttl
+    ))
+)
+user_cache = near_cache(TTLCache(
+    "users",
+    maxsize=conf.user_cache_size,
+    ttl=conf.user_cache_ttl,
+    stale_ttl=conf.user_cache_stale_ttl
+))
+revocations = Revocations(max_age=conf.revocation_max_age)
+gateway = Gateway(
+    repo,
+    user_cache=user_cache,
+    revocations=revocations,
+    stateless=conf.auth_mode == "stateless",
+    access_ttl=conf.access_token_ttl
+)
+upstreams: Dict[str, httpx.AsyncClient] = {}
+guards = create_guards(conf, UPSTREAMS)
+hedger = Hedger(
+    RetryBudget(
+        ratio=conf.retry_budget_ratio,
+        capacity=conf.retry_budget_capacity
+    ),
+    percentile=conf.hedge_percentile,
+    min_delay=conf.hedge_min_delay,
+    backoff=conf.retry_backoff,
+    backoff_max=conf.retry_backoff_max
+)
+response_cache = ResponseCache(near_cache(
+    TTLCache(
+        "responses",
+        maxsize=conf.response_cache_size,
+        ttl=conf.response_cache_retention
+    ),
+    encode=encode_entry,
+    decode=decode_entry
+))
+coalescer = SingleFlight()
+catalog = Catalog(
+    products_url=conf.catalog_products_url,
+    services_url=conf.catalog_services_url,
+    max_age=conf.catalog_max_age,
+    max_results=conf.catalog_max_results
+)
+catalog_task: Optional[asyncio.Task] = None
+invalidation_task: Optional[asyncio.Task] = None
+revocation_task: Optional[asyncio.Task] = None
+profiler = Profiler(
+    interval=conf.profiling_interval,
+    sample_rate=conf.profiling_sample_rate,
+    keep=conf.profiling_keep
+)
 
 
 def get_gateway():
     return gateway
+
+
+async def shutdown_upstreams():
+    await close_upstreams(upstreams)
+    upstreams.clear()
+
+
+def start_catalog_sync():
+    global catalog_task
+    if conf.catalog_index_enabled:
+        catalog_task = asyncio.create_task(catalog.run(
+            lambda: get_upstream(SERVICE),
+            conf.catalog_sync_interval
+        ))
+
+
+async def stop_catalog_sync():
+    global catalog_task
+    if catalog_task is not None:
+        catalog_task.cancel()
+        await asyncio.gather(catalog_task, return_exceptions=True)
+        catalog_task = None
+
+
+def start_revocation_sync():
+    global revocation_task
+    if gateway.stateless:
+        revocation_task = asyncio.create_task(revocations.run(
+            repo,
+            conf.revocation_sync_interval
+        ))
+
+
+async def stop_revocation_sync():
+    global revocation_task
+    if revocation_task is not None:
+        revocation_task.cancel()
+        await asyncio.gather(revocation_task, return_exceptions=True)
+        revocation_task = None
+
+
+def start_invalidation_listener():
+    global invalidation_task
+    if cache_backend is not None:
+        invalidation_task = asyncio.create_task(listen_invalidations(
+            cache_backend,
+            conf.cache_channel,
+            [user_cache, response_cache.entries]
+        ))
+
+
+async def shutdown_cache_backend():
+    global invalidation_task
+    if invalidation_task is not None:
+        invalidation_task.cancel()
+        await asyncio.gather(invalidation_task, return_exceptions=True)
+        invalidation_task = None
+    if cache_backend is not None:
+        await cache_backend.close()
+
+
+async def drain_background(timeout: float):
+    """Let hedge losers and cache revalidations finish before pools close"""
+    pending = hedger.background | response_cache.tasks
+    if not pending:
+        return
+    log.info(f"Draining {len(pending)} background upstream calls")
+    _, unfinished = await asyncio.wait(pending, timeout=timeout)
+    for task in unfinished:
+        task.cancel()
+    await asyncio.gather(*unfinished, return_exceptions=True)
+    if unfinished:
+        log.warning(f"Cancelled {len(unfinished)} background upstream calls")
+
+
+def shutdown_password_pool():
+    repo.verifier.shutdown()
+
+
+def shutdown_database():
+    repo.close()
+
+
+def get_upstream(name: str) -> httpx.AsyncClient:
+    if name not in upstreams:
+        upstreams[name] = create_upstream(conf, name)
+    return upstreams[name]
@@ -24,3 +24,15 @@ class InactiveUserError(Exception):
 
 class RuleRelatedToResultError(Exception):
     """When decode data not return anything"""
+
+
+class ServiceOverloadedError(Exception):
+    """When the gateway has no capacity left to serve a request"""
+
+
+class UpstreamUnavailableError(Exception):
+    """When an upstream is shedding load or its circuit is open"""
+
+
+class CacheBackendError(Exception):
+    """When the shared cache backend rejects or fails a command"""
@@ -0,0 +1,67 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Hashable, Optional, Tuple
+
+from app.metrics import CACHE_REQUESTS
+
+
+@dataclass
+class TTLCache:
+    """Bounded in-process cache with per-entry expiry and LRU eviction
+
+    Expired entries are kept for ``stale_ttl`` more seconds so callers
+    can fall back to them with ``get_stale`` when the source of truth is
+    unavailable.
+    """
+
+    name: str
+    maxsize: int = 1024
+    ttl: float = 60.0
+    stale_ttl: float = 0.0
+    hits: int = 0
+    misses: int = 0
+    entries: "OrderedDict[Hashable, Tuple[Any, float]]" = field(
+        default_factory=OrderedDict
+    )
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self.entries.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            self._purge(key)
+            self.misses += 1
+            CACHE_REQUESTS.labels(self.name, "miss").inc()
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        CACHE_REQUESTS.labels(self.name, "hit").inc()
+        return entry[0]
+
+    def get_stale(self, key: Hashable) -> Optional[Any]:
+        self._purge(key)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        CACHE_REQUESTS.labels(self.name, "stale").inc()
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self.entries[key] = (value, expires_at)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _purge(self, key: Hashable):
+        entry = self.entries.get(key)
+        if entry is not None and entry[1] + self.stale_ttl <= time.monotonic():
+            del self.entries[key]
@@ -0,0 +1,63 @@
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+
+
+class CacheBackendInterface(ABC):
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        """Get a value shared by every gateway replica
+
+        Args:
+            key (str): namespaced cache key
+
+        Returns:
+            Optional[bytes]: stored value, None when missing or expired
+        """
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float):
+        """Store a value for every gateway replica
+
+        Args:
+            key (str): namespaced cache key
+            value (bytes): encoded value
+            ttl (float): seconds before the value expires
+        """
+
+    @abstractmethod
+    async def delete(self, key: str):
+        """Remove a value
+
+        Args:
+            key (str): namespaced cache key
+        """
+
+    @abstractmethod
+    async def publish(self, channel: str, message: str):
+        """Send a message to every replica listening on a channel
+
+        Args:
+            channel (str): channel name
+            message (str): message, a cache key for invalidations
+        """
+
+    @abstractmethod
+    async def listen(
+        self,
+        channel: str,
+        on_message: Callable[[str], None],
+        on_reset: Callable[[], None]
+    ):
+        """Deliver channel messages until cancelled
+
+        Args:
+            channel (str): channel name
+            on_message (Callable[[str], None]): called with every message
+            on_reset (Callable[[], None]): called when messages may have
+                been missed, after reconnecting
+        """
+
+    @abstractmethod
+    async def close(self):
+        """Close connections to the backend"""
@@ -0,0 +1,243 @@
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from app.errors import CacheBackendError
+from app.infra.cache_backend_i import CacheBackendInterface
+
+log = logging.getLogger(__name__)
+
+RECONNECT_DELAY = 1.0
+
+
+@dataclass
+class MemoryBackend(CacheBackendInterface):
+    """Process-local backend, shared only by caches of the same worker"""
+
+    values: Dict[str, Tuple[bytes, float]] = field(default_factory=dict)
+    listeners: Dict[str, Set[asyncio.Queue]] = field(default_factory=dict)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self.values.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            self.values.pop(key, None)
+            return None
+        return entry[0]
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        self.values[key] = (value, time.monotonic() + ttl)
+
+    async def delete(self, key: str):
+        self.values.pop(key, None)
+
+    async def publish(self, channel: str, message: str):
+        for queue in self.listeners.get(channel, ()):
+            queue.put_nowait(message)
+
+    async def listen(
+        self,
+        channel: str,
+        on_message: Callable[[str], None],
+        on_reset: Callable[[], None]
+    ):
+        queue: asyncio.Queue = asyncio.Queue()
+        self.listeners.setdefault(channel, set()).add(queue)
+        try:
+            while True:
+                on_message(await queue.get())
+        finally:
+            self.listeners[channel].discard(queue)
+
+    async def close(self):
+        self.values.clear()
+
+
+def encode_command(*args: Any) -> bytes:
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        value = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(value), value))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Cache backend closed the connection")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        raise CacheBackendError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        size = int(rest)
+        if size < 0:
+            return None
+        return (await reader.readexactly(size + 2))[:-2]
+    if kind == b"*":
+        size = int(rest)
+        if size < 0:
+            return None
+        return [await read_reply(reader) for _ in range(size)]
+    raise CacheBackendError(f"Unexpected reply {line!r}")
+
+
+@dataclass
+class RespConnection:
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+
+    @classmethod
+    async def open(
+        cls,
+        host: str,
+        port: int,
+        password: Optional[str],
+        db: int
+    ) -> "RespConnection":
+        reader, writer = await asyncio.open_connection(host, port)
+        connection = cls(reader, writer)
+        if password:
+            await connection.execute("AUTH", password)
+        if db:
+            await connection.execute("SELECT", db)
+        return connection
+
+    async def execute(self, *args: Any) -> Any:
+        self.writer.write(encode_command(*args))
+        await self.writer.drain()
+        return await read_reply(self.reader)
+
+    def close(self):
+        self.writer.close()
+
+
+@dataclass
+class RespBackend(CacheBackendInterface):
+    """Networked backend speaking the Redis protocol (RESP2)
+
+    Commands go through a small pool of connections, a connection that
+    failed or timed out mid-command is dropped instead of returned since
+    its reply stream can no longer be trusted. Pub/sub messages use their
+    own connection, reconnected after failures.
+    """
+
+    host: str = "localhost"
+    port: int = 6379
+    password: Optional[str] = None
+    db: int = 0
+    timeout: float = 0.05
+    pool_size: int = 8
+    idle: List[RespConnection] = field(default_factory=list)
+    slots: Optional[asyncio.Semaphore] = None
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "RespBackend":
+        parsed = urlparse(url)
+        return cls(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            password=parsed.password,
+            db=int(parsed.path.strip("/") or 0),
+            **kwargs
+        )
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.execute("GET", key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self.execute("SET", key, value, "PX", max(1, int(ttl * 1000)))
+
+    async def delete(self, key: str):
+        await self.execute("DEL", key)
+
+    async def publish(self, channel: str, message: str):
+        await self.execute("PUBLISH", channel, message)
+
+    async def execute(self, *args: Any) -> Any:
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.pool_size)
+        async with self.slots:
+            connection = self.idle.pop() if self.idle else None
+            try:
+                if connection is None:
+                    connection = await asyncio.wait_for(
+                        self._connect(),
+                        self.timeout
+                    )
+                reply = await asyncio.wait_for(
+                    connection.execute(*args),
+                    self.timeout
+                )
+            except BaseException:
+                if connection is not None:
+                    connection.close()
+                raise
+            self.idle.append(connection)
+            return reply
+
+    async def listen(
+        self,
+        channel: str,
+        on_message: Callable[[str], None],
+        on_reset: Callable[[], None]
+    ):
+        while True:
+            connection = None
+            try:
+                connection = await self._connect()
+                await connection.execute("SUBSCRIBE", channel)
+                on_reset()
+                while True:
+                    reply = await read_reply(connection.reader)
+                    try:
+                        kind, _, data = reply
+                        if kind == b"message":
+                            on_message(data.decode())
+                    except (ValueError, TypeError, AttributeError) as e:
+                        log.warning(
+                            f"Ignoring invalidation reply {reply!r}: {e}"
+                        )
+            except (
+                OSError,
+                ConnectionError,
+                asyncio.IncompleteReadError,
+                CacheBackendError,
+            ) as e:
+                log.warning(f"Cache invalidation channel lost: {e}")
+            finally:
+                if connection is not None:
+                    connection.close()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def close(self):
+        while self.idle:
+            self.idle.pop().close()
+
+    async def _connect(self) -> RespConnection:
+        return await RespConnection.open(
+            self.host,
+            self.port,
+            self.password,
+            self.db
+        )
+
+
+def create_cache_backend(
+    url: Optional[str],
+    timeout: float,
+    pool_size: int
+) -> Optional[CacheBackendInterface]:
+    if not url:
+        return None
+    scheme = urlparse(url).scheme
+    if scheme == "memory":
+        return MemoryBackend()
+    if scheme in ("redis", "resp"):
+        return RespBackend.from_url(url, timeout=timeout, pool_size=pool_size)
+    raise ValueError(f"Unsupported cache backend {url}")
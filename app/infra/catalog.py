@@ -0,0 +1,217 @@
+import re
+import sys
+import time
+import asyncio
+import logging
+import unicodedata
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from app.metrics import (
+    CATALOG_BYTES,
+    CATALOG_DOCUMENTS,
+    CATALOG_SEARCHES,
+    CATALOG_SYNC_SECONDS,
+    CATALOG_SYNC_ERRORS,
+)
+from app.serialization import dumps
+
+import httpx
+
+log = logging.getLogger(__name__)
+
+WORD = re.compile(r"\w+")
+PRODUCT_FIELDS = ("title", "brand", "model")
+
+
+def tokenize(text: str) -> List[str]:
+    normalized = unicodedata.normalize("NFKD", text.lower())
+    stripped = "".join(c for c in normalized if not unicodedata.combining(c))
+    return WORD.findall(stripped)
+
+
+def serialize(docs: List[dict]) -> List[bytes]:
+    return [dumps(doc) for doc in docs]
+
+
+@dataclass
+class PrefixIndex:
+    """Inverted index answering word-prefix searches over documents
+
+    Documents are kept already serialized so a search only joins the
+    matching JSON fragments. Every query word has to prefix some word of
+    the indexed fields.
+    """
+
+    documents: List[bytes] = field(default_factory=list)
+    tokens: List[str] = field(default_factory=list)
+    postings: List[array] = field(default_factory=list)
+
+    @classmethod
+    def build(
+        cls,
+        docs: List[dict],
+        fields: Sequence[str],
+        documents: Optional[List[bytes]] = None
+    ) -> "PrefixIndex":
+        by_token: Dict[str, array] = {}
+        for position, doc in enumerate(docs):
+            words = set()
+            for name in fields:
+                words.update(tokenize(str(doc.get(name, ""))))
+            for word in words:
+                by_token.setdefault(word, array("I")).append(position)
+        tokens = sorted(by_token)
+        return cls(
+            documents=documents or serialize(docs),
+            tokens=tokens,
+            postings=[by_token[token] for token in tokens],
+        )
+
+    def _prefixed(self, prefix: str) -> set:
+        matches = set()
+        position = bisect_left(self.tokens, prefix)
+        while (
+            position < len(self.tokens)
+            and self.tokens[position].startswith(prefix)
+        ):
+            matches.update(self.postings[position])
+            position += 1
+        return matches
+
+    def search(self, term: str, limit: int) -> bytes:
+        words = tokenize(term)
+        if not words:
+            positions = range(min(limit, len(self.documents)))
+        else:
+            found = self._prefixed(words[0])
+            for word in words[1:]:
+                if not found:
+                    break
+                found &= self._prefixed(word)
+            positions = sorted(found)[:limit]
+        return b"[" + b",".join(self.documents[i] for i in positions) + b"]"
+
+    def footprint(self) -> int:
+        return (
+            sum(sys.getsizeof(doc) for doc in self.documents)
+            + sum(sys.getsizeof(token) for token in self.tokens)
+            + sum(sys.getsizeof(posting) for posting in self.postings)
+        )
+
+
+def build_indexes(
+    products: List[dict],
+    services: List[dict]
+) -> Dict[str, PrefixIndex]:
+    service_documents = serialize(services)
+    return {
+        "products": PrefixIndex.build(products, PRODUCT_FIELDS),
+        "service_names": PrefixIndex.build(
+            services,
+            ("name",),
+            service_documents
+        ),
+        "service_descriptions": PrefixIndex.build(
+            services,
+            ("description",),
+            service_documents
+        ),
+    }
+
+
+@dataclass
+class Catalog:
+    """Periodically synced snapshot of the product/service catalog
+
+    The snapshot is fetched with an empty search term, which the upstream
+    answers with its whole catalog. Searches are answered locally, at
+    most ``max_results`` documents like the upstream search, while the
+    snapshot is younger than ``max_age``. Otherwise, or after a write
+    through the gateway until the next sync, resolvers return ``None``
+    and the caller falls back to the upstream.
+    """
+
+    products_url: str
+    services_url: str
+    max_age: float = 900.0
+    max_results: int = 50
+    indexes: Dict[str, PrefixIndex] = field(default_factory=dict)
+    synced_at: Optional[float] = None
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def is_fresh(self) -> bool:
+        return (
+            self.synced_at is not None
+            and time.monotonic() - self.synced_at < self.max_age
+        )
+
+    def resolver(
+        self,
+        index: str,
+        param: str
+    ) -> Callable[[Dict[str, Any]], Optional[bytes]]:
+        def resolve(params: Dict[str, Any]) -> Optional[bytes]:
+            if not self.is_fresh():
+                CATALOG_SEARCHES.labels(index, "fallback").inc()
+                return None
+            CATALOG_SEARCHES.labels(index, "local").inc()
+            return self.indexes[index].search(
+                params.get(param) or "",
+                self.max_results
+            )
+        return resolve
+
+    def invalidate(self):
+        """Fall back to the upstream and sync again after a catalog write"""
+        self.synced_at = None
+        self.changed.set()
+
+    async def sync(self, upstream: httpx.AsyncClient):
+        started_at = time.perf_counter()
+        self.changed.clear()
+        products = await self._fetch(upstream, self.products_url)
+        services = await self._fetch(upstream, self.services_url)
+        self.indexes = await asyncio.to_thread(
+            build_indexes,
+            products,
+            services
+        )
+        if not self.changed.is_set():
+            self.synced_at = time.monotonic()
+        CATALOG_SYNC_SECONDS.set(time.perf_counter() - started_at)
+        for name, index in self.indexes.items():
+            CATALOG_DOCUMENTS.labels(name).set(len(index.documents))
+            CATALOG_BYTES.labels(name).set(index.footprint())
+        log.info(
+            f"Catalog synced: {len(products)} products, "
+            f"{len(services)} services"
+        )
+
+    async def run(
+        self,
+        get_client: Callable[[], httpx.AsyncClient],
+        interval: float
+    ):
+        while True:
+            if (
+                self.synced_at is None
+                or time.monotonic() - self.synced_at >= interval
+            ):
+                try:
+                    await self.sync(get_client())
+                except Exception as e:
+                    CATALOG_SYNC_ERRORS.inc()
+                    log.error(f"Could not sync catalog: {e}")
+            try:
+                await asyncio.wait_for(self.changed.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+    @staticmethod
+    async def _fetch(upstream: httpx.AsyncClient, url: str) -> List[dict]:
+        response = await upstream.get(url)
+        response.raise_for_status()
+        return response.json()
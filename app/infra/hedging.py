@@ -0,0 +1,193 @@
+import time
+import random
+import asyncio
+import logging
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, Optional, Set
+
+from app.metrics import (
+    HEDGES,
+    HEDGE_SAVED,
+    RETRIES,
+    RETRY_BUDGET_EXHAUSTED,
+)
+
+import httpx
+
+log = logging.getLogger(__name__)
+
+RETRY_STATUSES = {502, 503, 504}
+MIN_SAMPLES = 20
+
+Attempt = Callable[[], Awaitable[httpx.Response]]
+
+
+@dataclass
+class LatencyTracker:
+    samples: Deque[float] = field(default_factory=lambda: deque(maxlen=512))
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, quantile: float) -> Optional[float]:
+        if len(self.samples) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(quantile * len(ordered)))]
+
+
+@dataclass
+class RetryBudget:
+    """Token bucket shared by every retry and hedge of the gateway
+
+    Each request deposits ``ratio`` tokens and each extra attempt spends
+    one, so extra load stays a bounded share of normal traffic even when
+    an upstream is failing.
+    """
+
+    ratio: float = 0.1
+    capacity: float = 100.0
+    tokens: float = 10.0
+
+    def deposit(self):
+        self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+@dataclass
+class Hedger:
+    """Hedged attempts and jittered retries for idempotent upstream GETs
+
+    A hedge is sent once the first attempt has been running longer than
+    the route's ``percentile`` latency, the first answer wins. The losing
+    attempt is left to finish in the background, which keeps its pooled
+    connection and tells how much latency the hedge saved, streamed
+    losers are closed as soon as they answer.
+    """
+
+    budget: RetryBudget
+    percentile: float = 0.95
+    min_delay: float = 0.01
+    backoff: float = 0.05
+    backoff_max: float = 1.0
+    trackers: Dict[str, LatencyTracker] = field(
+        default_factory=lambda: defaultdict(LatencyTracker)
+    )
+    background: Set[asyncio.Task] = field(default_factory=set)
+
+    async def call(
+        self,
+        route: str,
+        attempt: Attempt,
+        hedge: bool = False,
+        retries: int = 0
+    ) -> httpx.Response:
+        self.budget.deposit()
+        tries = 0
+        while True:
+            try:
+                if hedge:
+                    response = await self._hedged(route, attempt)
+                else:
+                    response = await self._timed(route, attempt)
+            except httpx.TransportError:
+                if not self._may_retry(route, tries, retries, "transport"):
+                    raise
+            else:
+                retryable = response.status_code in RETRY_STATUSES
+                if not retryable or not self._may_retry(
+                    route,
+                    tries,
+                    retries,
+                    str(response.status_code)
+                ):
+                    return response
+                await response.aclose()
+            await asyncio.sleep(random.uniform(
+                0,
+                min(self.backoff_max, self.backoff * 2 ** tries)
+            ))
+            tries += 1
+
+    def _may_retry(
+        self,
+        route: str,
+        tries: int,
+        retries: int,
+        reason: str
+    ) -> bool:
+        if tries >= retries:
+            return False
+        if not self.budget.withdraw():
+            RETRY_BUDGET_EXHAUSTED.labels(route).inc()
+            return False
+        RETRIES.labels(route, reason).inc()
+        return True
+
+    async def _timed(self, route: str, attempt: Attempt) -> httpx.Response:
+        started_at = time.monotonic()
+        response = await attempt()
+        if response.status_code < 500:
+            self.trackers[route].observe(time.monotonic() - started_at)
+        return response
+
+    async def _hedged(self, route: str, attempt: Attempt) -> httpx.Response:
+        delay = self.trackers[route].percentile(self.percentile)
+        if delay is None:
+            return await self._timed(route, attempt)
+        primary = asyncio.ensure_future(self._timed(route, attempt))
+        hedge = None
+        try:
+            done, _ = await asyncio.wait(
+                {primary},
+                timeout=max(delay, self.min_delay)
+            )
+            if done:
+                return primary.result()
+            if not self.budget.withdraw():
+                RETRY_BUDGET_EXHAUSTED.labels(route).inc()
+                return await primary
+            HEDGES.labels(route, "sent").inc()
+            hedge = asyncio.ensure_future(self._timed(route, attempt))
+            pending = {primary, hedge}
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        self._settle(route, task is hedge, pending)
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        except asyncio.CancelledError:
+            primary.cancel()
+            if hedge is not None:
+                hedge.cancel()
+            raise
+
+    def _settle(self, route: str, hedge_won: bool, losers: Set[asyncio.Task]):
+        HEDGES.labels(route, "won" if hedge_won else "lost").inc()
+        won_at = time.monotonic()
+
+        def finish(task: asyncio.Task):
+            self.background.discard(task)
+            if task.cancelled() or task.exception() is not None:
+                return
+            if hedge_won:
+                HEDGE_SAVED.labels(route).inc(time.monotonic() - won_at)
+            closing = asyncio.ensure_future(task.result().aclose())
+            self.background.add(closing)
+            closing.add_done_callback(self.background.discard)
+
+        for task in losers:
+            self.background.add(task)
+            task.add_done_callback(finish)
@@ -0,0 +1,144 @@
+import json
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+from app.errors import CacheBackendError
+from app.infra.cache import TTLCache
+from app.infra.cache_backend_i import CacheBackendInterface
+from app.metrics import CACHE_BACKEND_ERRORS, CACHE_INVALIDATIONS
+from app.serialization import dumps, loads
+
+log = logging.getLogger(__name__)
+
+BACKEND_ERRORS = (
+    OSError,
+    ConnectionError,
+    asyncio.TimeoutError,
+    asyncio.IncompleteReadError,
+    CacheBackendError,
+)
+
+
+def key_name(key: Hashable) -> str:
+    if isinstance(key, str):
+        return key
+    if isinstance(key, bytes):
+        return key.hex()
+    return json.dumps(key, separators=(",", ":"), default=str)
+
+
+@dataclass
+class NearCache:
+    """In-process ``TTLCache`` in front of a cache shared by all replicas
+
+    Reads are served locally and only go to the backend on a local miss,
+    writes go to both. Local copies of shared entries live at most
+    ``near_ttl`` seconds, invalidations are published so every replica
+    drops its copy at once. Backend failures are logged and the cache
+    degrades to its local layer. Without a backend this is the plain
+    local cache.
+    """
+
+    local: TTLCache
+    backend: Optional[CacheBackendInterface] = None
+    channel: str = "gateway:invalidations"
+    near_ttl: float = 5.0
+    encode: Callable[[Any], bytes] = dumps
+    decode: Callable[[bytes], Any] = loads
+
+    @property
+    def name(self) -> str:
+        return self.local.name
+
+    @property
+    def ttl(self) -> float:
+        return self.local.ttl
+
+    def __len__(self) -> int:
+        return len(self.local)
+
+    async def get(self, key: Hashable) -> Optional[Any]:
+        name = key_name(key)
+        value = self.local.get(name)
+        if value is not None or self.backend is None:
+            return value
+        content = await self._call("get", self.backend.get(self._remote(name)))
+        if content is None:
+            return None
+        try:
+            value = self.decode(content)
+        except (ValueError, TypeError) as e:
+            CACHE_BACKEND_ERRORS.labels(self.name, "decode").inc()
+            log.warning(f"Cache backend value for {name} is corrupt: {e!r}")
+            return None
+        self.local.set(name, value, ttl=min(self.local.ttl, self.near_ttl))
+        return value
+
+    def get_stale(self, key: Hashable) -> Optional[Any]:
+        return self.local.get_stale(key_name(key))
+
+    async def set(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: Optional[float] = None
+    ):
+        name = key_name(key)
+        ttl = self.local.ttl if ttl is None else ttl
+        if self.backend is None:
+            self.local.set(name, value, ttl=ttl)
+            return
+        self.local.set(name, value, ttl=min(ttl, self.near_ttl))
+        await self._call(
+            "set",
+            self.backend.set(self._remote(name), self.encode(value), ttl)
+        )
+
+    async def invalidate(self, key: Hashable):
+        name = key_name(key)
+        self.local.invalidate(name)
+        if self.backend is None:
+            return
+        await self._call("delete", self.backend.delete(self._remote(name)))
+        await self._call(
+            "publish",
+            self.backend.publish(self.channel, self._remote(name))
+        )
+
+    def clear(self):
+        self.local.clear()
+
+    def _remote(self, name: str) -> str:
+        return f"{self.local.name}:{name}"
+
+    async def _call(self, operation: str, command) -> Any:
+        try:
+            return await command
+        except BACKEND_ERRORS as e:
+            CACHE_BACKEND_ERRORS.labels(self.name, operation).inc()
+            log.warning(f"Cache backend {operation} on {self.name}: {e!r}")
+            return None
+
+
+async def listen_invalidations(
+    backend: CacheBackendInterface,
+    channel: str,
+    caches: Iterable[NearCache]
+):
+    """Drop local copies invalidated by any replica until cancelled"""
+    by_name: Dict[str, NearCache] = {cache.name: cache for cache in caches}
+
+    def on_message(message: str):
+        name, _, key = message.partition(":")
+        cache = by_name.get(name)
+        if cache is not None:
+            CACHE_INVALIDATIONS.labels(name).inc()
+            cache.local.invalidate(key)
+
+    def on_reset():
+        for cache in by_name.values():
+            cache.clear()
+
+    await backend.listen(channel, on_message, on_reset)
@@ -0,0 +1,72 @@
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+from app.errors import ServiceOverloadedError
+from app.metrics import VERIFY_LATENCY, VERIFY_QUEUE_WAIT, VERIFY_PENDING
+
+from passlib.context import CryptContext
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class PasswordVerifier:
+    """Runs password hash checks on a bounded thread pool
+
+    bcrypt releases the GIL while hashing, so worker threads keep the
+    CPU cost off the event loop. Once ``max_pending`` checks are running
+    or queued, new ones are rejected instead of piling up.
+    """
+
+    context: CryptContext
+    workers: int = 4
+    max_pending: int = 64
+    pending: int = 0
+    executor: Optional[ThreadPoolExecutor] = None
+
+    async def verify(self, form_pass: str, hashed_pass: str) -> bool:
+        if self.pending >= self.max_pending:
+            log.warning("Password verification queue is full")
+            raise ServiceOverloadedError(
+                "Too many password verifications in progress"
+            )
+        queued_at = time.perf_counter()
+
+        def run() -> bool:
+            started_at = time.perf_counter()
+            VERIFY_QUEUE_WAIT.observe(started_at - queued_at)
+            try:
+                return self.context.verify(form_pass, hashed_pass)
+            finally:
+                VERIFY_LATENCY.observe(time.perf_counter() - started_at)
+
+        self.pending += 1
+        VERIFY_PENDING.inc()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool(), run)
+        finally:
+            self.pending -= 1
+            VERIFY_PENDING.dec()
+
+    async def warm(self):
+        """Start the pool and load the hash backend before the first login"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._pool(), self.context.dummy_verify)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="password"
+            )
+        return self.executor
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
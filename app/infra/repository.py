@@ -1,37 +1,108 @@
+import time
+import hashlib
 import logging
 from datetime import timedelta, datetime
 from dataclasses import dataclass
+from typing import Callable, Optional, Set
 
-from app.config import Configuration
+from app.config import get_settings
+from app.infra.cache import TTLCache
+from app.infra.near_cache import NearCache
+from app.infra.passwords import PasswordVerifier
 from app.infra.repository_i import RepositoryInterface
 from app.schemas import UserDict, TokenToEncode
 from app.errors import DBError, UserNotFoundException
+from app.metrics import JWT_VERIFY_LATENCY, JWT_VERIFY_SAVED
 
 from jose import jwt
 from passlib.context import CryptContext
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from pymongo.errors import (
     ConnectionFailure,
-    ExecutionTimeout
+    ExecutionTimeout,
+    OperationFailure,
 )
 
-conf = Configuration()
+conf = get_settings()
 log = logging.getLogger(__name__)
 
+USER_PROJECTION = {"_id": 0, "username": 1, "password": 1}
+USERNAME_INDEX = "username_unique"
+ACCESS = "access"
+REFRESH = "refresh"
+
 
 @dataclass
 class Repository(RepositoryInterface):
 
-    nosql_conn: AsyncIOMotorDatabase
+    connect: Callable[[], AsyncIOMotorDatabase]
     pwd_context: CryptContext = CryptContext(
         schemes=["bcrypt"],
         deprecated="auto"
     )
+    verifier: Optional[PasswordVerifier] = None
+    token_cache: Optional[NearCache] = None
+    verify_seconds: float = 0.0
+    verifications: int = 0
+    nosql_conn: Optional[AsyncIOMotorDatabase] = None
+
+    def __post_init__(self):
+        if self.verifier is None:
+            self.verifier = PasswordVerifier(
+                self.pwd_context,
+                workers=conf.password_workers,
+                max_pending=conf.password_queue_limit
+            )
+        if self.token_cache is None:
+            self.token_cache = NearCache(TTLCache(
+                "tokens",
+                maxsize=conf.token_cache_size,
+                ttl=conf.token_cache_ttl
+            ))
+
+    @property
+    def database(self) -> AsyncIOMotorDatabase:
+        """Database handle, the Motor client is created on first use"""
+        if self.nosql_conn is None:
+            self.nosql_conn = self.connect()
+        return self.nosql_conn
+
+    async def ping(self):
+        try:
+            await self.database.command("ping")
+        except (ConnectionFailure, ExecutionTimeout) as e:
+            raise DBError(f"Database did not answer ping: {e}")
+
+    async def ensure_indexes(self):
+        """Create the unique username index unless one already exists"""
+        collection = self.database[conf.collection]
+        try:
+            indexes = await collection.index_information()
+            for name, index in indexes.items():
+                if [field for field, _ in index["key"]] != ["username"]:
+                    continue
+                if not index.get("unique"):
+                    log.warning(f"Index {name} on username is not unique")
+                return
+            await collection.create_index(
+                "username",
+                unique=True,
+                name=USERNAME_INDEX
+            )
+        except (ConnectionFailure, ExecutionTimeout, OperationFailure) as e:
+            raise DBError(f"Could not ensure the username index: {e}")
+        log.info(f"Created index {USERNAME_INDEX} on {conf.collection}")
+
+    def close(self):
+        if self.nosql_conn is not None:
+            self.nosql_conn.client.close()
+            self.nosql_conn = None
 
     async def get_user(self, username: str) -> UserDict:
         try:
-            user = await self.nosql_conn[conf.collection].find_one(
-                {"username": username}
+            user = await self.database[conf.collection].find_one(
+                {"username": username},
+                USER_PROJECTION
             )
         except (ConnectionFailure, ExecutionTimeout):
             raise DBError(
@@ -44,21 +115,63 @@ class Repository(RepositoryInterface):
         return UserDict(**user)  # type: ignore
 
     async def verify_password(self, form_pass: str, hashed_pass: str) -> bool:
-        return self.pwd_context.verify(form_pass, hashed_pass)
+        return await self.verifier.verify(form_pass, hashed_pass)
+
+    async def create_acces_token(
+        self,
+        user_data: str,
+        expires_in: Optional[float] = None
+    ) -> str:
+        if expires_in is None:
+            expires_in = conf.expire_time * 60
+        return self.encode_token(user_data, ACCESS, expires_in)
+
+    async def create_refresh_token(self, user_data: str) -> str:
+        return self.encode_token(user_data, REFRESH, conf.refresh_token_ttl)
 
-    async def create_acces_token(self, user_data: str) -> str:
-        expire_time = conf.expire_time
+    def encode_token(self, user_data: str, kind: str, expires_in: float):
         secret_key = conf.secret_key
         algorithm = conf.algorithm
-        time = datetime.utcnow() + timedelta(minutes=expire_time)
+        time = datetime.utcnow() + timedelta(seconds=expires_in)
         user_encode = TokenToEncode(
             sub=user_data,
-            exp=time)
+            exp=time,
+            type=kind)
         encoded_jwt = jwt.encode(user_encode, secret_key, algorithm=algorithm)
         return encoded_jwt
 
+    async def get_revoked_users(self) -> Set[str]:
+        try:
+            cursor = self.database[conf.revocation_collection].find(
+                {},
+                {"_id": 0, "username": 1}
+            )
+            return {document["username"] async for document in cursor}
+        except (ConnectionFailure, ExecutionTimeout) as e:
+            raise DBError(f"Could not read revoked users: {e}")
+
     async def decode_token(self, token: str) -> TokenToEncode:
+        digest = hashlib.sha256(token.encode()).digest()
+        payload = await self.token_cache.get(digest)
+        now = time.time()
+        if payload is not None:
+            if payload.get("exp", now + 1) <= now:
+                await self.token_cache.invalidate(digest)
+                raise jwt.ExpiredSignatureError("Signature has expired.")
+            if self.verifications:
+                JWT_VERIFY_SAVED.inc(self.verify_seconds / self.verifications)
+            return payload
         secret_key = conf.secret_key
         algorithm = conf.algorithm
+        started_at = time.perf_counter()
         payload = jwt.decode(token, secret_key, algorithms=[algorithm])
+        elapsed = time.perf_counter() - started_at
+        JWT_VERIFY_LATENCY.observe(elapsed)
+        self.verify_seconds += elapsed
+        self.verifications += 1
+        ttl = self.token_cache.ttl
+        if "exp" in payload:
+            ttl = min(ttl, payload["exp"] - now)
+        if ttl > 0:
+            await self.token_cache.set(digest, payload, ttl=ttl)
         return payload
@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, Optional, Set
 from abc import ABC, abstractmethod
 
 
@@ -25,16 +25,33 @@ class RepositoryInterface(ABC):
         """
 
     @abstractmethod
-    async def create_acces_token(self, user_data: Any) -> str:
+    async def create_acces_token(
+        self,
+        user_data: Any,
+        expires_in: Optional[float] = None
+    ) -> str:
         """Create access token for a user
 
         Args:
             data_to_encode (Any): data to generate access token
+            expires_in (Optional[float]): lifetime in seconds, the
+                configured ``expire_time`` when None
 
         Returns:
             str: access token
         """
 
+    @abstractmethod
+    async def create_refresh_token(self, user_data: Any) -> str:
+        """Create a long lived token only accepted to get access tokens
+
+        Args:
+            user_data (Any): user owning the token
+
+        Returns:
+            str: refresh token
+        """
+
     @abstractmethod
     async def decode_token(self, token: str) -> Any:
         """Decode received token
@@ -45,3 +62,11 @@ class RepositoryInterface(ABC):
         Returns:
             Any: token decoded
         """
+
+    @abstractmethod
+    async def get_revoked_users(self) -> Set[str]:
+        """Get users whose tokens must no longer be accepted
+
+        Returns:
+            Set[str]: revoked usernames
+        """
@@ -0,0 +1,238 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field, fields, replace
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Tuple
+
+from app.config import Configuration
+from app.errors import UpstreamUnavailableError
+from app.metrics import BREAKER_STATE, UPSTREAM_IN_FLIGHT, UPSTREAM_REJECTED
+
+import httpx
+
+log = logging.getLogger(__name__)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+@dataclass(frozen=True)
+class UpstreamPolicy:
+    connect_timeout: float
+    read_timeout: float
+    max_in_flight: int
+    bulkhead_wait: float
+    failure_threshold: float
+    min_requests: int
+    window: float
+    slow_call: float
+    open_seconds: float
+
+
+def policy_for(conf: Configuration, upstream: str) -> UpstreamPolicy:
+    policy = UpstreamPolicy(
+        connect_timeout=conf.upstream_connect_timeout,
+        read_timeout=conf.upstream_read_timeout,
+        max_in_flight=conf.upstream_max_in_flight,
+        bulkhead_wait=conf.upstream_bulkhead_wait,
+        failure_threshold=conf.breaker_failure_threshold,
+        min_requests=conf.breaker_min_requests,
+        window=conf.breaker_window,
+        slow_call=conf.breaker_slow_call,
+        open_seconds=conf.breaker_open_seconds,
+    )
+    overrides = conf.upstream_policies.get(upstream, {})
+    types = {
+        policy_field.name: policy_field.type
+        for policy_field in fields(UpstreamPolicy)
+    }
+    unknown = set(overrides) - set(types)
+    if unknown:
+        log.warning(f"Ignoring unknown policy keys for {upstream}: {unknown}")
+    return replace(
+        policy,
+        **{
+            key: types[key](value)
+            for key, value in overrides.items()
+            if key in types
+        }
+    )
+
+
+@dataclass
+class CircuitBreaker:
+    """Rolling-window breaker counting errors and slow calls as failures
+
+    Opens once ``failure_threshold`` of at least ``min_requests`` calls in
+    the last ``window`` seconds failed, rejects calls for
+    ``open_seconds`` and then lets a single probe decide whether to close
+    again.
+    """
+
+    upstream: str
+    policy: UpstreamPolicy
+    state: str = CLOSED
+    opened_at: float = 0.0
+    probing: bool = False
+    calls: Deque[Tuple[float, bool]] = field(default_factory=deque)
+
+    def __post_init__(self):
+        BREAKER_STATE.labels(self.upstream).set(STATE_VALUES[self.state])
+
+    def allow(self) -> bool:
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.policy.open_seconds:
+                return False
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self.probing:
+                return False
+            self.probing = True
+        return True
+
+    def record(self, success: bool):
+        now = time.monotonic()
+        if self.state == HALF_OPEN:
+            self.probing = False
+            if success:
+                self.calls.clear()
+                self._transition(CLOSED)
+            else:
+                self._open(now)
+            return
+        self.calls.append((now, success))
+        while self.calls and self.calls[0][0] < now - self.policy.window:
+            self.calls.popleft()
+        if len(self.calls) < self.policy.min_requests:
+            return
+        failures = sum(1 for _, ok in self.calls if not ok)
+        if failures / len(self.calls) >= self.policy.failure_threshold:
+            self._open(now)
+
+    def release(self):
+        if self.state == HALF_OPEN:
+            self.probing = False
+
+    def _open(self, now: float):
+        self.opened_at = now
+        self.calls.clear()
+        self._transition(OPEN)
+
+    def _transition(self, state: str):
+        if state != self.state:
+            log.warning(f"Circuit for {self.upstream} is now {state}")
+        self.state = state
+        BREAKER_STATE.labels(self.upstream).set(STATE_VALUES[state])
+
+
+class HeldStream(httpx.AsyncByteStream):
+    """Response body that keeps its bulkhead slot until it is closed"""
+
+    def __init__(
+        self,
+        stream: httpx.AsyncByteStream,
+        finish: Callable[[bool], None]
+    ):
+        self.stream = stream
+        self.finish = finish
+        self.failed = False
+        self.closed = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in self.stream:
+                yield chunk
+        except httpx.HTTPError:
+            self.failed = True
+            raise
+
+    async def aclose(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            await self.stream.aclose()
+        finally:
+            self.finish(self.failed)
+
+
+@dataclass
+class UpstreamGuard:
+    """Bulkhead plus circuit breaker wrapped around every upstream call
+
+    With ``hold`` the slot and the breaker sample last until the response
+    body is closed, so streamed bodies count for their whole transfer.
+    """
+
+    upstream: str
+    policy: UpstreamPolicy
+    breaker: CircuitBreaker = field(init=False)
+    slots: asyncio.Semaphore = field(init=False)
+
+    def __post_init__(self):
+        self.breaker = CircuitBreaker(self.upstream, self.policy)
+        self.slots = asyncio.Semaphore(self.policy.max_in_flight)
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[httpx.Response]],
+        hold: bool = False
+    ) -> httpx.Response:
+        if not self.breaker.allow():
+            UPSTREAM_REJECTED.labels(self.upstream, "circuit_open").inc()
+            raise UpstreamUnavailableError(f"Circuit for {self.upstream} open")
+        try:
+            await asyncio.wait_for(
+                self.slots.acquire(),
+                self.policy.bulkhead_wait
+            )
+        except asyncio.TimeoutError:
+            self.breaker.release()
+            UPSTREAM_REJECTED.labels(self.upstream, "bulkhead_full").inc()
+            raise UpstreamUnavailableError(
+                f"Too many requests in flight to {self.upstream}"
+            )
+        UPSTREAM_IN_FLIGHT.labels(self.upstream).inc()
+        started_at = time.monotonic()
+        try:
+            response = await call()
+        except httpx.HTTPError:
+            self.breaker.record(False)
+            self._release()
+            raise
+        except BaseException:
+            self.breaker.release()
+            self._release()
+            raise
+
+        def finish(failed: bool):
+            elapsed = time.monotonic() - started_at
+            self._release()
+            self.breaker.record(
+                not failed
+                and response.status_code < 500
+                and elapsed < self.policy.slow_call
+            )
+
+        if hold:
+            response.stream = HeldStream(response.stream, finish)
+        else:
+            finish(False)
+        return response
+
+    def _release(self):
+        self.slots.release()
+        UPSTREAM_IN_FLIGHT.labels(self.upstream).dec()
+
+
+def create_guards(
+    conf: Configuration,
+    upstreams: Tuple[str, ...]
+) -> Dict[str, UpstreamGuard]:
+    return {
+        name: UpstreamGuard(name, policy_for(conf, name))
+        for name in upstreams
+    }
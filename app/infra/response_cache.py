@@ -0,0 +1,136 @@
+import time
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+from app.infra.near_cache import NearCache
+from app.serialization import dumps, loads
+
+import httpx
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedResponse:
+    content: bytes
+    status_code: int
+    media_type: str
+    etag: str
+    upstream_etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    stored_at: float = field(default_factory=time.time)
+    encoded: Dict[str, bytes] = field(default_factory=dict, repr=False)
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+
+def encode_entry(entry: CachedResponse) -> bytes:
+    """Metadata as a JSON line followed by the raw body"""
+    meta = dumps({
+        "status_code": entry.status_code,
+        "media_type": entry.media_type,
+        "etag": entry.etag,
+        "upstream_etag": entry.upstream_etag,
+        "last_modified": entry.last_modified,
+        "stored_at": entry.stored_at,
+    })
+    return meta + b"\n" + entry.content
+
+
+def decode_entry(data: bytes) -> CachedResponse:
+    meta, _, content = data.partition(b"\n")
+    return CachedResponse(content=content, **loads(meta))
+
+
+def cache_key(upstream: str, url: str, params: Dict[str, Any]) -> Hashable:
+    return (upstream, url, tuple(sorted(params.items())))
+
+
+def compute_etag(content: bytes) -> str:
+    return '"{}"'.format(hashlib.blake2b(content, digest_size=16).hexdigest())
+
+
+def entry_for(response: httpx.Response, content: bytes) -> CachedResponse:
+    return CachedResponse(
+        content=content,
+        status_code=response.status_code,
+        media_type="application/json",
+        etag=compute_etag(content),
+        upstream_etag=response.headers.get("etag"),
+        last_modified=response.headers.get("last-modified"),
+    )
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(
+        tag == "*" or tag.removeprefix("W/") == etag
+        for tag in candidates
+    )
+
+
+@dataclass
+class ResponseCache:
+    """Upstream responses kept for conditional revalidation
+
+    Entries outlive their route TTL so an expired entry can still be
+    revalidated with ``If-None-Match``/``If-Modified-Since`` or served
+    while a background refresh is running.
+    """
+
+    entries: NearCache
+    revalidating: Set[Hashable] = field(default_factory=set)
+    tasks: Set[asyncio.Task] = field(default_factory=set)
+
+    async def get(self, key: Hashable) -> Optional[CachedResponse]:
+        return await self.entries.get(key)
+
+    async def store(
+        self,
+        key: Hashable,
+        response: httpx.Response,
+        content: bytes
+    ) -> CachedResponse:
+        entry = entry_for(response, content)
+        await self.entries.set(key, entry)
+        return entry
+
+    async def touch(
+        self,
+        key: Hashable,
+        entry: CachedResponse
+    ) -> CachedResponse:
+        entry.stored_at = time.time()
+        await self.entries.set(key, entry)
+        return entry
+
+    async def invalidate(self, key: Hashable):
+        await self.entries.invalidate(key)
+
+    def revalidate(
+        self,
+        key: Hashable,
+        refresh: Callable[[], Awaitable[Any]]
+    ):
+        if key in self.revalidating:
+            return
+
+        async def run():
+            try:
+                await refresh()
+            except Exception as e:
+                log.warning(f"Background revalidation of {key} failed: {e}")
+            finally:
+                self.revalidating.discard(key)
+
+        self.revalidating.add(key)
+        task = asyncio.create_task(run())
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
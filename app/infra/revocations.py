@@ -0,0 +1,50 @@
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import FrozenSet, Optional
+
+from app.infra.repository_i import RepositoryInterface
+from app.metrics import REVOKED_USERS, REVOCATION_SYNC_ERRORS
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class Revocations:
+    """Periodically synced set of users whose tokens are not honoured
+
+    Stateless token validation only trusts token claims while the set is
+    younger than ``max_age``, otherwise callers fall back to checking the
+    user in the database.
+    """
+
+    max_age: float = 120.0
+    users: FrozenSet[str] = frozenset()
+    synced_at: Optional[float] = None
+
+    def __contains__(self, username: str) -> bool:
+        return username in self.users
+
+    def is_fresh(self) -> bool:
+        return (
+            self.synced_at is not None
+            and time.monotonic() - self.synced_at < self.max_age
+        )
+
+    async def sync(self, repo: RepositoryInterface):
+        users = frozenset(await repo.get_revoked_users())
+        if users != self.users:
+            log.info(f"Revocation set synced: {len(users)} users")
+        self.users = users
+        self.synced_at = time.monotonic()
+        REVOKED_USERS.set(len(users))
+
+    async def run(self, repo: RepositoryInterface, interval: float):
+        while True:
+            try:
+                await self.sync(repo)
+            except Exception as e:
+                REVOCATION_SYNC_ERRORS.inc()
+                log.error(f"Could not sync revoked users: {e}")
+            await asyncio.sleep(interval)
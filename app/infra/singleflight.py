@@ -0,0 +1,46 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class Flight:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+@dataclass
+class SingleFlight:
+    """Shares one in-flight call among concurrent callers of the same key
+
+    Results and errors fan out to every waiter. A waiter being cancelled
+    does not affect the others, the shared call is only cancelled once
+    nobody is waiting for it anymore.
+    """
+
+    flights: Dict[Hashable, Flight] = field(default_factory=dict)
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        flight = self.flights.get(key)
+        if flight is None:
+            flight = Flight(asyncio.ensure_future(call()))
+            self.flights[key] = flight
+            flight.task.add_done_callback(
+                lambda _: self._forget(key, flight)
+            )
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                self._forget(key, flight)
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _forget(self, key: Hashable, flight: Flight):
+        if self.flights.get(key) is flight:
+            del self.flights[key]
@@ -0,0 +1,47 @@
+import logging
+from typing import Dict
+
+from app.config import Configuration
+from app.infra.resilience import policy_for
+
+import httpx
+
+log = logging.getLogger(__name__)
+
+QUOTER = "quoter"
+CLIENT = "client"
+SERVICE = "service"
+UPSTREAMS = (QUOTER, CLIENT, SERVICE)
+
+
+def create_upstream(conf: Configuration, name: str) -> httpx.AsyncClient:
+    base_urls = {
+        QUOTER: conf.quoter_url,
+        CLIENT: conf.client_url,
+        SERVICE: conf.service_url,
+    }
+    limits = httpx.Limits(
+        max_connections=conf.upstream_max_connections,
+        max_keepalive_connections=conf.upstream_max_keepalive,
+        keepalive_expiry=conf.upstream_keepalive_expiry
+    )
+    policy = policy_for(conf, name)
+    timeout = httpx.Timeout(
+        policy.read_timeout,
+        connect=policy.connect_timeout,
+        pool=conf.upstream_pool_timeout
+    )
+    return httpx.AsyncClient(
+        base_url=base_urls[name],
+        limits=limits,
+        timeout=timeout,
+        headers={"Accept-Encoding": conf.upstream_accept_encoding}
+    )
+
+
+async def close_upstreams(upstreams: Dict[str, httpx.AsyncClient]):
+    for name, client in upstreams.items():
+        try:
+            await client.aclose()
+        except Exception as e:
+            log.error(f"Could not close upstream {name}: {e}")
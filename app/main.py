@@ -1,7 +1,29 @@
+import time
 import logging
+import threading
+from contextlib import asynccontextmanager
 
-from app.router import quoters, security, clients, products
-from app.config import Configuration, configure_logger
+from app import depends, startup
+from app.router import (
+    quoters,
+    security,
+    clients,
+    products,
+    monitoring,
+    profiling,
+    health,
+)
+from app.config import get_settings, configure_logger
+from app.compression import CompressionMiddleware
+from app.metrics import (
+    REQUEST_LATENCY,
+    REQUEST_PHASE,
+    mark_worker_exited,
+    prepare_multiprocess,
+)
+from app.timing import start_timings, server_timing
+from app.profiling import PROFILE_HEADER, PROFILE_ID_HEADER
+from app.serialization import FastJSONResponse
 
 import uvicorn
 from fastapi import FastAPI, Request
@@ -14,6 +36,23 @@ origins = [
 
 
 log = logging.getLogger(__name__)
+conf = get_settings()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logger()
+    await startup.start(app)
+    yield
+    startup.state.ready = False
+    await depends.stop_catalog_sync()
+    await depends.stop_revocation_sync()
+    await depends.drain_background(conf.drain_timeout)
+    await depends.shutdown_upstreams()
+    await depends.shutdown_cache_backend()
+    depends.shutdown_password_pool()
+    depends.shutdown_database()
+    mark_worker_exited()
 
 
 app = FastAPI(
@@ -21,11 +60,17 @@ app = FastAPI(
     description="Entrypoint for all backend with cotizapp backend",
     version="0.0.1",
     openapi_url="/api/openapi.json",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 app.include_router(security.router)
 app.include_router(quoters.router)
 app.include_router(clients.router)
 app.include_router(products.router)
+app.include_router(monitoring.router)
+app.include_router(health.router)
+if conf.profiling_enabled:
+    app.include_router(profiling.router)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -37,16 +82,77 @@ app.add_middleware(
 
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
+    timings = start_timings()
+    started_at = time.perf_counter()
     response = await call_next(request)
+    total = time.perf_counter() - started_at
+    route = request.scope.get("route")
+    path = getattr(route, "path", "unmatched")
+    REQUEST_LATENCY.labels(
+        path,
+        request.method,
+        response.status_code
+    ).observe(total)
+    for phase, seconds in timings.items():
+        REQUEST_PHASE.labels(path, phase).observe(seconds)
+    response.headers["Server-Timing"] = server_timing(timings, total)
     return response
 
-if __name__ == "__main__":
-    conf = Configuration()
+
+async def profile_request(request: Request, call_next):
+    if not (
+        depends.profiler.sampled()
+        or PROFILE_HEADER in request.headers
+        and await security.is_admin_request(request, depends.gateway)
+    ):
+        return await call_next(request)
+    label = f"{request.method} {request.url.path}"
+    with depends.profiler.capture(label, threading.get_ident()) as profile:
+        response = await call_next(request)
+    if profile is not None:
+        response.headers[PROFILE_ID_HEADER] = profile.id
+    return response
+
+
+if conf.profiling_enabled:
+    app.middleware("http")(profile_request)
+if conf.compression_enabled:
+    app.add_middleware(CompressionMiddleware)
+
+
+def serve(app_path: str = "app.main:app"):
+    """Run the gateway, spawning ``workers`` processes when more than one
+
+    Workers import the app on their own, so each one owns its upstream
+    and Mongo pools and its caches. On SIGTERM they stop accepting
+    connections and finish in-flight requests for up to
+    ``graceful_timeout`` seconds before the lifespan shutdown runs.
+
+    With several workers ``/metrics`` aggregates every worker through
+    Prometheus multiprocess mode, in ``PROMETHEUS_MULTIPROC_DIR`` or a
+    temporary directory. Profiles are kept in the worker that captured
+    them, so profiling requires a single worker.
+    """
     configure_logger()
-    config = uvicorn.Config(
-        app="app.main:app",
+    if conf.workers > 1:
+        if conf.profiling_enabled:
+            raise ValueError(
+                "Profiling keeps profiles per worker, set WORKERS=1 to use it"
+            )
+        prepare_multiprocess()
+    uvicorn.run(
+        app_path,
+        host=conf.host,
         port=conf.port,
-        host=conf.host
+        workers=conf.workers,
+        backlog=conf.backlog,
+        timeout_keep_alive=conf.keep_alive,
+        timeout_graceful_shutdown=conf.graceful_timeout,
+        loop=conf.event_loop,
+        http=conf.http_parser,
+        log_level=conf.log_level.lower(),
     )
-    server = uvicorn.Server(config)
-    server.run()
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,214 @@
+import os
+import tempfile
+from glob import glob
+
+from prometheus_client import Counter, Gauge, Histogram, multiprocess
+
+MULTIPROC_DIR = "PROMETHEUS_MULTIPROC_DIR"
+
+SCHEMA_SAMPLES = Counter(
+    "gateway_schema_samples_total",
+    "Trusted upstream responses validated against their response model",
+    ["route"]
+)
+SCHEMA_DRIFT = Counter(
+    "gateway_schema_drift_total",
+    "Sampled upstream responses that did not match their response model",
+    ["route"]
+)
+CACHE_REQUESTS = Counter(
+    "gateway_cache_requests_total",
+    "Lookups on gateway in-process caches",
+    ["cache", "result"]
+)
+CACHE_BACKEND_ERRORS = Counter(
+    "gateway_cache_backend_errors_total",
+    "Shared cache backend operations that failed and fell back to local",
+    ["cache", "operation"]
+)
+CACHE_INVALIDATIONS = Counter(
+    "gateway_cache_invalidations_received_total",
+    "Invalidation messages received on the shared channel",
+    ["cache"]
+)
+VERIFY_LATENCY = Histogram(
+    "gateway_password_verify_seconds",
+    "Time spent checking a password hash"
+)
+VERIFY_QUEUE_WAIT = Histogram(
+    "gateway_password_queue_wait_seconds",
+    "Time a password check waited for a worker thread"
+)
+VERIFY_PENDING = Gauge(
+    "gateway_password_pending",
+    "Password checks running or waiting for a worker thread",
+    multiprocess_mode="livesum"
+)
+JWT_VERIFY_LATENCY = Histogram(
+    "gateway_jwt_verify_seconds",
+    "Time spent verifying a token signature on a token cache miss"
+)
+JWT_VERIFY_SAVED = Counter(
+    "gateway_jwt_verify_saved_seconds",
+    "Estimated verification time saved by token cache hits"
+)
+TOKEN_VALIDATIONS = Counter(
+    "gateway_token_validations_total",
+    "Access tokens validated from their claims or against the database",
+    ["mode"]
+)
+REVOKED_USERS = Gauge(
+    "gateway_revoked_users",
+    "Users in the local revocation set",
+    multiprocess_mode="livemax"
+)
+REVOCATION_SYNC_ERRORS = Counter(
+    "gateway_revocation_sync_errors_total",
+    "Revocation set syncs that failed"
+)
+CATALOG_DOCUMENTS = Gauge(
+    "gateway_catalog_documents",
+    "Documents held by the local catalog index",
+    ["index"],
+    multiprocess_mode="livemax"
+)
+CATALOG_BYTES = Gauge(
+    "gateway_catalog_bytes",
+    "Approximate memory used by the local catalog index",
+    ["index"],
+    multiprocess_mode="livemax"
+)
+CATALOG_SYNC_SECONDS = Gauge(
+    "gateway_catalog_sync_seconds",
+    "Duration of the last catalog sync",
+    multiprocess_mode="livemax"
+)
+CATALOG_SYNC_ERRORS = Counter(
+    "gateway_catalog_sync_errors_total",
+    "Catalog syncs that failed"
+)
+CATALOG_SEARCHES = Counter(
+    "gateway_catalog_searches_total",
+    "Searches answered by the local catalog or sent upstream",
+    ["index", "result"]
+)
+UPSTREAM_COALESCED = Counter(
+    "gateway_upstream_coalesced_total",
+    "Upstream GETs by whether they started a call or joined one in flight",
+    ["upstream", "role"]
+)
+BREAKER_STATE = Gauge(
+    "gateway_breaker_state",
+    "Circuit breaker state per upstream: 0 closed, 1 half open, 2 open",
+    ["upstream"],
+    multiprocess_mode="livemax"
+)
+UPSTREAM_IN_FLIGHT = Gauge(
+    "gateway_upstream_in_flight",
+    "Requests currently running against each upstream",
+    ["upstream"],
+    multiprocess_mode="livesum"
+)
+UPSTREAM_REJECTED = Counter(
+    "gateway_upstream_rejected_total",
+    "Upstream calls failed fast by the circuit breaker or the bulkhead",
+    ["upstream", "reason"]
+)
+HEDGES = Counter(
+    "gateway_hedges_total",
+    "Hedged upstream requests sent and which attempt answered first",
+    ["route", "outcome"]
+)
+HEDGE_SAVED = Counter(
+    "gateway_hedge_saved_seconds",
+    "Latency saved by hedges, measured against the losing first attempt",
+    ["route"]
+)
+RETRIES = Counter(
+    "gateway_retries_total",
+    "Upstream GETs retried, by failure reason",
+    ["route", "reason"]
+)
+RETRY_BUDGET_EXHAUSTED = Counter(
+    "gateway_retry_budget_exhausted_total",
+    "Retries or hedges skipped because the retry budget was empty",
+    ["route"]
+)
+REQUEST_LATENCY = Histogram(
+    "gateway_request_duration_seconds",
+    "Time to produce a response, per route, method and status",
+    ["route", "method", "status"]
+)
+REQUEST_PHASE = Histogram(
+    "gateway_request_phase_seconds",
+    "Time spent per request in auth, upstream calls and serialization",
+    ["route", "phase"]
+)
+MONGO_CONNECTIONS = Gauge(
+    "gateway_mongo_pool_connections",
+    "Connections open in the Mongo connection pool",
+    multiprocess_mode="livesum"
+)
+MONGO_CHECKED_OUT = Gauge(
+    "gateway_mongo_pool_checked_out",
+    "Mongo connections currently checked out of the pool",
+    multiprocess_mode="livesum"
+)
+MONGO_POOL_WAIT = Histogram(
+    "gateway_mongo_pool_wait_seconds",
+    "Time spent waiting to check a connection out of the Mongo pool",
+    buckets=(
+        0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+        0.25, 0.5, 1.0, 2.5
+    )
+)
+MONGO_CHECKOUT_FAILURES = Counter(
+    "gateway_mongo_pool_checkout_failures_total",
+    "Mongo connection check outs that failed, by reason",
+    ["reason"]
+)
+COMPRESSION_RESPONSES = Counter(
+    "gateway_compression_responses_total",
+    "Compressible responses by outcome: compressed, small or passthrough",
+    ["route", "result"]
+)
+COMPRESSION_SAVED = Counter(
+    "gateway_compression_saved_bytes_total",
+    "Response bytes saved by compression",
+    ["route", "encoding"]
+)
+COMPRESSION_CPU = Counter(
+    "gateway_compression_cpu_seconds_total",
+    "CPU time spent compressing responses",
+    ["route", "encoding"]
+)
+STARTUP_SECONDS = Gauge(
+    "gateway_startup_seconds",
+    "Time spent in each cold start phase of this process",
+    ["phase"]
+)
+
+
+def prepare_multiprocess():
+    """Share samples between the workers about to be spawned
+
+    Must run before the workers import ``prometheus_client``, the
+    directory is emptied so samples of a previous run are not counted.
+    """
+    path = os.environ.get(MULTIPROC_DIR) or tempfile.mkdtemp(
+        prefix="gateway-metrics-"
+    )
+    os.makedirs(path, exist_ok=True)
+    for name in glob(os.path.join(path, "*.db")):
+        os.remove(name)
+    os.environ[MULTIPROC_DIR] = path
+
+
+def is_multiprocess() -> bool:
+    return MULTIPROC_DIR in os.environ
+
+
+def mark_worker_exited():
+    """Drop the live gauges of this worker from the shared samples"""
+    if is_multiprocess():
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,184 @@
+import sys
+import time
+import uuid
+import random
+import asyncio
+import logging
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+Stack = Tuple[str, ...]
+
+
+def frame_name(frame) -> str:
+    module = frame.f_globals.get("__name__", "?")
+    code = frame.f_code
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def frame_stack(frame) -> Stack:
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return tuple(reversed(names))
+
+
+@dataclass
+class Profile:
+    """Stack samples collected for a single request or a worker window
+
+    ``samples`` counts how many times each stack, root first, was seen.
+    """
+
+    label: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    started_at: float = field(default_factory=time.time)
+    duration: float = 0.0
+    samples: Counter = field(default_factory=Counter)
+
+    @property
+    def total(self) -> int:
+        return sum(self.samples.values())
+
+    def top(self, limit: int = 25) -> List[Dict]:
+        own: Counter = Counter()
+        inclusive: Counter = Counter()
+        for stack, count in self.samples.items():
+            own[stack[-1]] += count
+            for name in set(stack):
+                inclusive[name] += count
+        total = self.total or 1
+        return [
+            {
+                "function": name,
+                "self": own[name],
+                "total": count,
+                "self_percent": round(100 * own[name] / total, 2),
+                "total_percent": round(100 * count / total, 2),
+            }
+            for name, count in sorted(
+                inclusive.items(),
+                key=lambda item: (own[item[0]], item[1]),
+                reverse=True
+            )[:limit]
+        ]
+
+    def collapsed(self) -> str:
+        """Stacks in the folded format read by flamegraph.pl/speedscope"""
+        return "".join(
+            f"{';'.join(stack)} {count}\n"
+            for stack, count in self.samples.most_common()
+        )
+
+
+@dataclass
+class Sampler:
+    """Background thread reading the interpreter stacks every ``interval``
+
+    Samples only ``thread_id`` when given, otherwise every thread but its
+    own, prefixing each stack with the thread name.
+    """
+
+    profile: Profile
+    interval: float
+    thread_id: Optional[int] = None
+    stopped: threading.Event = field(default_factory=threading.Event)
+    thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self._run,
+            name="profiler",
+            daemon=True
+        )
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            names = {
+                thread.ident: thread.name
+                for thread in threading.enumerate()
+            }
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if self.thread_id is not None:
+                    if ident == self.thread_id:
+                        self.profile.samples[frame_stack(frame)] += 1
+                    continue
+                thread = names.get(ident, str(ident))
+                stack = (f"thread:{thread}",) + frame_stack(frame)
+                self.profile.samples[stack] += 1
+
+
+@dataclass
+class Profiler:
+    """Captures stack profiles on demand and keeps the latest ``keep``
+
+    Only one capture runs at a time so overlapping triggers do not stack
+    sampler threads on a busy worker.
+    """
+
+    interval: float = 0.005
+    sample_rate: float = 0.0
+    keep: int = 20
+    profiles: "OrderedDict[str, Profile]" = field(default_factory=OrderedDict)
+    active: bool = False
+
+    def sampled(self) -> bool:
+        return random.random() < self.sample_rate
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        return self.profiles.get(profile_id)
+
+    @contextmanager
+    def capture(
+        self,
+        label: str,
+        thread_id: Optional[int] = None
+    ) -> Iterator[Optional[Profile]]:
+        if self.active:
+            yield None
+            return
+        self.active = True
+        profile = Profile(label)
+        sampler = Sampler(profile, self.interval, thread_id)
+        started_at = time.perf_counter()
+        sampler.start()
+        try:
+            yield profile
+        finally:
+            sampler.stop()
+            self.active = False
+            profile.duration = time.perf_counter() - started_at
+            self._store(profile)
+
+    async def window(self, seconds: float) -> Optional[Profile]:
+        with self.capture(f"window {seconds}s") as profile:
+            if profile is not None:
+                await asyncio.sleep(seconds)
+        return profile
+
+    def _store(self, profile: Profile):
+        self.profiles[profile.id] = profile
+        while len(self.profiles) > self.keep:
+            self.profiles.popitem(last=False)
+        log.info(
+            f"Profile {profile.id} for {profile.label}: "
+            f"{profile.total} samples in {profile.duration:.3f}s"
+        )
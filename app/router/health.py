@@ -0,0 +1,28 @@
+from app import startup
+
+from fastapi import APIRouter, Response, status
+
+router = APIRouter(
+    tags=["health"],
+)
+
+
+@router.get("/health/live", include_in_schema=False)
+async def liveness():
+    return {"status": "alive"}
+
+
+@router.get("/health/ready", include_in_schema=False)
+async def readiness(response: Response):
+    if not startup.state.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "starting", "startup": startup.state.phases}
+    checks = await startup.readiness()
+    ready = all(check["ok"] for check in checks.values())
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {
+        "status": "ready" if ready else "unavailable",
+        "checks": checks,
+        "startup": startup.state.phases,
+    }
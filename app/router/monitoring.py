@@ -0,0 +1,82 @@
+import os
+from typing import List, Optional
+
+from app import depends
+from app.metrics import is_multiprocess
+
+from fastapi import APIRouter, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+router = APIRouter(
+    tags=["monitoring"],
+)
+
+
+class GatewayCollector:
+    """Reads pool and cache sizes from the live gateway objects on scrape
+
+    With several workers the sizes are those of the worker answering the
+    scrape, labelled with its ``worker`` id.
+    """
+
+    def __init__(self, worker: Optional[str] = None):
+        self.worker = worker
+
+    def collect(self):
+        connections = GaugeMetricFamily(
+            "gateway_upstream_pool_connections",
+            "Connections held by each upstream HTTP pool",
+            labels=self.labels("upstream", "state")
+        )
+        for name, client in depends.upstreams.items():
+            pool = getattr(client._transport, "_pool", None)
+            pooled = getattr(pool, "connections", [])
+            idle = sum(1 for connection in pooled if connection.is_idle())
+            connections.add_metric(self.values(name, "idle"), idle)
+            connections.add_metric(
+                self.values(name, "active"),
+                len(pooled) - idle
+            )
+        yield connections
+        entries = GaugeMetricFamily(
+            "gateway_cache_entries",
+            "Entries held by each in-process cache",
+            labels=self.labels("cache")
+        )
+        for cache in (
+            depends.user_cache,
+            depends.repo.token_cache,
+            depends.response_cache.entries,
+        ):
+            entries.add_metric(self.values(cache.name), len(cache))
+        yield entries
+
+    def labels(self, *names: str) -> List[str]:
+        return [*names, "worker"] if self.worker else list(names)
+
+    def values(self, *values: str) -> List[str]:
+        return [*values, self.worker] if self.worker else list(values)
+
+
+if is_multiprocess():
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(GatewayCollector(worker=str(os.getpid())))
+else:
+    registry = REGISTRY
+    registry.register(GatewayCollector())
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(
+        content=generate_latest(registry),
+        media_type=CONTENT_TYPE_LATEST
+    )
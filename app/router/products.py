@@ -1,20 +1,14 @@
-import logging
-from typing import Annotated, List
+from typing import List
 
-from app.config import Configuration
-from app.router.security import get_current_user
+from app.depends import catalog
+from app.infra.upstream import SERVICE
+from app.router.proxy import ProxyRoute, build_router, add_batch_routes
 from app.domain.entities import (
     ServiceModel,
     ServiceUpdateModel,
     ProductModel
 )
 
-import requests
-from fastapi import Depends, APIRouter, HTTPException, Response
-from fastapi.encoders import jsonable_encoder
-
-log = logging.getLogger(__name__)
-
 responses = {
     "401": {
         "description": "Unauthorized"
@@ -24,187 +18,103 @@ responses = {
     },
 }
 
-router = APIRouter(
+ROUTES = [
+    ProxyRoute(
+        name="search_product",
+        method="GET",
+        path="/api/v1/products",
+        upstream=SERVICE,
+        query={"product_name": ...},
+        response_model=List[ProductModel],
+        stream=True,
+        local=catalog.resolver("products", "product_name"),
+        hedge=True,
+        retries=2,
+    ),
+    ProxyRoute(
+        name="search_service_by_name",
+        method="GET",
+        path="/api/v1/services",
+        upstream=SERVICE,
+        query={"service_name": ...},
+        response_model=List[ServiceModel],
+        stream=True,
+        local=catalog.resolver("service_names", "service_name"),
+        hedge=True,
+        retries=2,
+    ),
+    ProxyRoute(
+        name="search_service_by_description",
+        method="GET",
+        path="/api/v1/services/description",
+        upstream=SERVICE,
+        query={"service_description": ...},
+        response_model=List[ServiceModel],
+        stream=True,
+        local=catalog.resolver(
+            "service_descriptions",
+            "service_description"
+        ),
+        hedge=True,
+        retries=2,
+    ),
+    ProxyRoute(
+        name="get_service",
+        method="GET",
+        path="/api/v1/services/{service_id}",
+        upstream=SERVICE,
+        response_model=ServiceModel,
+        cache_ttl=60,
+        stale_ttl=300,
+    ),
+    ProxyRoute(
+        name="get_product",
+        method="GET",
+        path="/api/v1/products/{product_id}",
+        upstream=SERVICE,
+        response_model=ProductModel,
+        cache_ttl=60,
+        stale_ttl=300,
+    ),
+    ProxyRoute(
+        name="create_service",
+        method="POST",
+        upstream_method="PATCH",
+        path="/api/v1/services",
+        upstream=SERVICE,
+        body=ServiceModel,
+        response_model=ServiceModel,
+        response_description="Add new service",
+        invalidates=("/api/v1/services/{_id}",),
+        on_write=catalog.invalidate,
+    ),
+    ProxyRoute(
+        name="create_product",
+        method="POST",
+        upstream_method="PATCH",
+        path="/api/v1/products",
+        upstream=SERVICE,
+        body=ProductModel,
+        response_model=ProductModel,
+        response_description="Add new product",
+        invalidates=("/api/v1/products/{_id}",),
+        on_write=catalog.invalidate,
+    ),
+    ProxyRoute(
+        name="modify_service",
+        method="PATCH",
+        path="/api/v1/services/{service_id}",
+        upstream=SERVICE,
+        body=ServiceUpdateModel,
+        invalidates=("/api/v1/services/{service_id}",),
+        on_write=catalog.invalidate,
+    ),
+]
+
+router = build_router(
+    ROUTES,
     tags=["products-services"],
     responses=responses,
 )
-
-conf = Configuration()
-UserDeps = Annotated[bool, Depends(get_current_user)]
-
-PRODUCT_URL = conf.service_url
-
-
-@router.get("/api/v1/products", response_model=List[ProductModel])
-async def search_product(product_name: str, user_validation: UserDeps):
-    url = f"{PRODUCT_URL}/api/v1/products?product_name={product_name}"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-    except Exception as e:
-        log.error(f"Could not get data from products: {e}")
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=response.text
-        )
-    if not response.text:
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=response.json().get("detail")
-        )
-    return response.json()
-
-
-@router.get("/api/v1/services", response_model=List[ServiceModel])
-async def search_service_by_name(service_name: str, user_validation: UserDeps):
-    url = f"{PRODUCT_URL}/api/v1/services?service_name={service_name}"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-    except Exception as e:
-        log.error(f"Could not get data from services: {e}")
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=response.text
-        )
-    if not response.text:
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=response.json().get("detail")
-        )
-    return response.json()
-
-
-@router.get("/api/v1/services/description", response_model=List[ServiceModel])
-async def search_service_by_description(
-    service_description: str,
-    user_validation: UserDeps
-):
-    url = (
-        f"{PRODUCT_URL}/api/v1/services/"
-        f"description?service_description={service_description}"
-    )
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-    except Exception as e:
-        log.error(f"Could not get data from services: {e}")
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=response.text
-        )
-    if not response.text:
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=response.json().get("detail")
-        )
-    return response.json()
-
-
-@router.get("/api/v1/services/{service_id}", response_model=ServiceModel)
-async def get_service(service_id: str, user_validation: UserDeps):
-    url = f"{PRODUCT_URL}/api/v1/services/{service_id}"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-    except Exception as e:
-        log.error(f"Could not get data from services: {e}")
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=response.text
-        )
-    if not response.text:
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=response.json().get("detail")
-        )
-    return response.json()
-
-
-@router.get("/api/v1/products/{product_id}", response_model=ProductModel)
-async def get_product(product_id: str, user_validation: UserDeps):
-    url = f"{PRODUCT_URL}/api/v1/products/{product_id}"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-    except Exception as e:
-        log.error(f"Could not get data from services: {e}")
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=response.text
-        )
-    if not response.text:
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=response.json().get("detail")
-        )
-    return response.json()
-
-
-@router.post(
-        "/api/v1/services",
-        response_description="Add new service",
-        response_model=ServiceModel)
-async def create_service(service: ServiceModel, user_validation: UserDeps):
-    url = f"{PRODUCT_URL}/api/v1/services"
-    try:
-        response = requests.patch(url, json=jsonable_encoder(service))
-        response.raise_for_status()
-    except Exception as e:
-        log.error(f"Could not get data from services: {e}")
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=response.text
-        )
-    if not response.text:
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=response.json().get("detail")
-        )
-    return response.json()
-
-
-@router.post(
-        "/api/v1/products",
-        response_description="Add new service",
-        response_model=ProductModel)
-async def create_product(product: ProductModel, user_validation: UserDeps):
-    url = f"{PRODUCT_URL}/api/v1/products"
-    try:
-        response = requests.patch(url, json=jsonable_encoder(product))
-        response.raise_for_status()
-    except Exception as e:
-        log.error(f"Could not get data from services: {e}")
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=response.text
-        )
-    if not response.text:
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=response.json().get("detail")
-        )
-    return response.json()
-
-
-@router.patch("/api/v1/services/{service_id}")
-async def modify_service(
-    service_id: str,
-    service: ServiceUpdateModel,
-    user_validation: UserDeps
-):
-    url = f"{PRODUCT_URL}/api/v1/services/{service_id}"
-    try:
-        response = requests.patch(url, json=jsonable_encoder(service))
-        response.raise_for_status()
-    except Exception as e:
-        log.error(f"Could not get data from services: {e}")
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=response.text
-        )
-    if not response.text:
-        return Response(
-            status_code=response.status_code
-        )
-    return response.json()
+add_batch_routes(router, "/api/v1/products", "get_product", "product_id")
+add_batch_routes(router, "/api/v1/services", "get_service", "service_id")
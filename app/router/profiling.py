@@ -0,0 +1,83 @@
+from typing import Annotated, List
+
+from app.config import get_settings
+from app.depends import profiler
+from app.profiling import Profile
+from app.router.security import get_admin_user
+from app.schemas import HotFunction, ProfileReport, ProfileSummary
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+conf = get_settings()
+
+router = APIRouter(
+    prefix="/api/v1/admin/profiles",
+    tags=["admin"],
+    dependencies=[Depends(get_admin_user)],
+    responses={
+        "401": {
+            "description": "Unauthorized"
+        },
+        "403": {
+            "description": "Not an admin"
+        },
+    },
+)
+
+
+def summarize(profile: Profile) -> ProfileSummary:
+    return ProfileSummary(
+        id=profile.id,
+        label=profile.label,
+        started_at=profile.started_at,
+        duration=profile.duration,
+        samples=profile.total,
+    )
+
+
+def find_profile(profile_id: str) -> Profile:
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Profile {profile_id} not found"
+        )
+    return profile
+
+
+@router.get("", response_model=List[ProfileSummary])
+async def list_profiles():
+    return [summarize(profile) for profile in reversed(
+        profiler.profiles.values()
+    )]
+
+
+@router.post("", response_model=ProfileSummary)
+async def profile_window(
+    seconds: Annotated[float, Query(gt=0)] = 5.0
+):
+    profile = await profiler.window(min(seconds, conf.profiling_max_window))
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Another profile is being captured"
+        )
+    return summarize(profile)
+
+
+@router.get("/{profile_id}", response_model=ProfileReport)
+async def get_profile(
+    profile_id: str,
+    limit: Annotated[int, Query(gt=0, le=500)] = 25
+):
+    profile = find_profile(profile_id)
+    return ProfileReport(
+        **summarize(profile).dict(),
+        top=[HotFunction(**row) for row in profile.top(limit)],
+    )
+
+
+@router.get("/{profile_id}/collapsed", response_class=PlainTextResponse)
+async def get_collapsed_stacks(profile_id: str):
+    return find_profile(profile_id).collapsed()
@@ -0,0 +1,633 @@
+import re
+import asyncio
+import random
+import logging
+from dataclasses import dataclass, field
+from inspect import Parameter, Signature
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
+from urllib.parse import quote
+
+from app.config import get_settings
+from app.compression import (
+    choose_encoding,
+    compress,
+    encoded_etag,
+    negotiate,
+    record,
+)
+from app.depends import (
+    get_upstream,
+    response_cache,
+    coalescer,
+    guards,
+    hedger,
+)
+from app.errors import UpstreamUnavailableError
+from app.schemas import BatchRequest, BatchResponse
+from app.serialization import dumps, loads
+from app.timing import SERIALIZE, UPSTREAM, timed
+from app.infra.response_cache import (
+    CachedResponse,
+    cache_key,
+    entry_for,
+    etag_matches,
+)
+from app.metrics import SCHEMA_SAMPLES, SCHEMA_DRIFT, UPSTREAM_COALESCED
+from app.router.security import get_current_user
+
+import httpx
+from pydantic import BaseModel, ValidationError, parse_raw_as
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+conf = get_settings()
+log = logging.getLogger(__name__)
+
+PATH_PARAM = re.compile(r"{(\w+)}")
+UNSAFE_ID = re.compile(r"[/?#]|\.\.")
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+@dataclass(frozen=True)
+class ProxyRoute:
+    """Declaration of a gateway endpoint forwarded to an upstream"""
+
+    name: str
+    method: str
+    # Path parameters are taken from the template
+    path: str
+    upstream: str
+    # Verb and path of the upstream endpoint, the gateway ones by default
+    upstream_method: Optional[str] = None
+    upstream_path: Optional[str] = None
+    # Parameter name to default, ``...`` marks it as required
+    query: Dict[str, Any] = field(default_factory=dict)
+    body: Optional[Type[BaseModel]] = None
+    # Only documents the payload of streamed routes
+    response_model: Any = None
+    response_description: str = "Successful Response"
+    auth: bool = True
+    # Relay the upstream body chunk by chunk without re-validating it
+    stream: bool = False
+    # Return upstream JSON as-is and validate a sample, None follows
+    # ``trust_upstream``
+    trusted: Optional[bool] = None
+    # Serve from the response cache, stale answers are revalidated in
+    # the background for ``stale_ttl`` more seconds
+    cache_ttl: Optional[float] = None
+    stale_ttl: float = 0.0
+    # Cached paths a successful write makes obsolete, formatted with the
+    # path parameters, the request body and the response body
+    invalidates: Tuple[str, ...] = ()
+    # Answer from gateway state given the query, None falls back to the
+    # upstream, the answer is validated like an upstream body
+    local: Optional[Callable[[Dict[str, Any]], Optional[bytes]]] = None
+    # Called after every successful forwarded write
+    on_write: Optional[Callable[[], None]] = None
+    # Idempotent GETs only: hedge slow calls, budgeted retries on
+    # connection errors and 502/503/504
+    hedge: bool = False
+    retries: int = 0
+    # Forward the client bytes once validated against ``body``, None
+    # follows ``forward_raw_bodies``
+    raw_body: Optional[bool] = None
+
+    @property
+    def is_trusted(self) -> bool:
+        if self.trusted is None:
+            return conf.trust_upstream
+        return self.trusted
+
+    @property
+    def forwards_raw_body(self) -> bool:
+        if self.raw_body is None:
+            return conf.forward_raw_bodies
+        return self.raw_body
+
+    @property
+    def forwarded_method(self) -> str:
+        return self.upstream_method or self.method
+
+    @property
+    def path_params(self) -> List[str]:
+        return PATH_PARAM.findall(self.path)
+
+
+registry: Dict[str, ProxyRoute] = {}
+
+
+def format_path(template: str, values: Dict[str, Any]) -> str:
+    """Fill a path template, each value escaped as a single segment"""
+    return template.format(**{
+        name: quote(str(value), safe="") for name, value in values.items()
+    })
+
+
+def encode_body(body: BaseModel) -> bytes:
+    with timed(SERIALIZE):
+        return dumps(body)
+
+
+def sample_validation(route: ProxyRoute, content: bytes):
+    if random.random() >= conf.validation_sample_rate:
+        return
+    SCHEMA_SAMPLES.labels(route.name).inc()
+    try:
+        parse_raw_as(route.response_model, content, json_loads=loads)
+    except ValidationError as e:
+        SCHEMA_DRIFT.labels(route.name).inc()
+        log.warning(f"Schema drift on {route.name}: {e}")
+
+
+def render(route: ProxyRoute, content: bytes) -> bytes:
+    """Validate and encode an upstream body like FastAPI would
+
+    Trusted routes and routes without a response model keep the upstream
+    bytes, the others are parsed into the response model and dumped the
+    same way ``JSONResponse`` does.
+    """
+    if not content or route.response_model is None:
+        return content
+    with timed(SERIALIZE):
+        if route.is_trusted:
+            sample_validation(route, content)
+            return content
+        return dumps(parse_raw_as(
+            route.response_model,
+            content,
+            json_loads=loads
+        ))
+
+
+def cached_response(
+    route: ProxyRoute,
+    entry: CachedResponse,
+    request: Request
+) -> Response:
+    """Cached body, compressed once per coding and reused on later hits
+
+    Every coding gets its own ETag, conditional requests are matched
+    against the one of the representation that would be sent.
+    """
+    content = entry.content
+    encoding = choose_encoding(
+        request.headers.get("accept-encoding"),
+        entry.media_type,
+        len(content)
+    )
+    etag = entry.etag
+    if encoding is not None:
+        etag = encoded_etag(etag, encoding)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if encoding is not None:
+        headers["Vary"] = "Accept-Encoding"
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers=headers
+        )
+    if encoding is not None:
+        if encoding not in entry.encoded:
+            entry.encoded[encoding] = compress(content, encoding, route.path)
+        content = entry.encoded[encoding]
+        record(route.path, encoding, len(entry.content), len(content))
+        headers["Content-Encoding"] = encoding
+    return Response(
+        content=content,
+        status_code=entry.status_code,
+        media_type=entry.media_type,
+        headers=headers
+    )
+
+
+def relay(response: httpx.Response, request: Request) -> StreamingResponse:
+    """Stream an upstream body, still encoded when the client accepts it"""
+    body = response.aiter_bytes()
+    headers = None
+    encoding = response.headers.get("content-encoding")
+    if encoding and negotiate(
+        request.headers.get("accept-encoding"),
+        (encoding,)
+    ):
+        body = response.aiter_raw()
+        headers = {"Content-Encoding": encoding, "Vary": "Accept-Encoding"}
+    return StreamingResponse(
+        body,
+        status_code=response.status_code,
+        media_type=response.headers.get("content-type", "application/json"),
+        headers=headers,
+        background=BackgroundTask(response.aclose)
+    )
+
+
+def upstream_error(response: httpx.Response) -> HTTPException:
+    try:
+        detail = response.json().get("detail", response.text)
+    except (ValueError, AttributeError):
+        detail = response.text
+    return HTTPException(status_code=response.status_code, detail=detail)
+
+
+async def _send(
+    route: ProxyRoute,
+    request: httpx.Request,
+    stream: bool = False
+) -> httpx.Response:
+    upstream = get_upstream(route.upstream)
+    guard = guards[route.upstream]
+
+    async def attempt() -> httpx.Response:
+        return await guard.run(
+            lambda: upstream.send(request, stream=stream),
+            hold=stream
+        )
+
+    try:
+        if request.method == "GET" and (route.hedge or route.retries):
+            response = await hedger.call(
+                route.name,
+                attempt,
+                hedge=route.hedge,
+                retries=route.retries
+            )
+        else:
+            response = await attempt()
+    except UpstreamUnavailableError as e:
+        log.error(f"Not calling {route.upstream} for {route.name}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Service {route.upstream} is unavailable"
+        )
+    except httpx.HTTPError as e:
+        log.error(f"Could not reach {route.upstream} for {route.name}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Could not connect to other services"
+        )
+    if response.is_error:
+        log.error(
+            f"Upstream {route.upstream} answered {response.status_code} "
+            f"for {route.name}"
+        )
+        if stream:
+            await response.aread()
+            await response.aclose()
+        raise upstream_error(response)
+    return response
+
+
+async def send(
+    route: ProxyRoute,
+    request: httpx.Request,
+    stream: bool = False
+) -> httpx.Response:
+    with timed(UPSTREAM):
+        if stream or request.method != "GET" or not conf.upstream_coalescing:
+            return await _send(route, request, stream)
+        return await coalesced(route, request)
+
+
+async def coalesced(
+    route: ProxyRoute,
+    request: httpx.Request
+) -> httpx.Response:
+    key = (
+        route.upstream,
+        str(request.url),
+        request.headers.get("if-none-match"),
+        request.headers.get("if-modified-since"),
+    )
+    role = "follower" if key in coalescer.flights else "leader"
+    UPSTREAM_COALESCED.labels(route.upstream, role).inc()
+    return await coalescer.do(key, lambda: _send(route, request))
+
+
+async def refresh(
+    route: ProxyRoute,
+    key: Hashable,
+    url: str,
+    params: Dict[str, Any],
+    entry: Optional[CachedResponse] = None
+) -> CachedResponse:
+    """Fetch ``url`` again, revalidating ``entry`` when there is one
+
+    Only 2xx bodies are stored, other answers that are not errors, like
+    a 304 with no entry to revalidate, are passed on without caching.
+    """
+    upstream = get_upstream(route.upstream)
+    headers = {}
+    if entry is not None and entry.upstream_etag:
+        headers["If-None-Match"] = entry.upstream_etag
+    if entry is not None and entry.last_modified:
+        headers["If-Modified-Since"] = entry.last_modified
+    request = upstream.build_request(
+        route.forwarded_method,
+        url,
+        params=params,
+        headers=headers
+    )
+    response = await send(route, request)
+    if response.status_code == status.HTTP_304_NOT_MODIFIED and entry:
+        return await response_cache.touch(key, entry)
+    if not response.is_success:
+        return entry_for(response, response.content)
+    return await response_cache.store(
+        key,
+        response,
+        render(route, response.content)
+    )
+
+
+async def cached_entry(
+    route: ProxyRoute,
+    url: str,
+    params: Dict[str, Any]
+) -> CachedResponse:
+    key = cache_key(route.upstream, url, params)
+    entry = await response_cache.get(key)
+    if entry is not None and entry.age < route.cache_ttl:
+        return entry
+    if entry is not None and entry.age < route.cache_ttl + route.stale_ttl:
+        stale = entry
+        response_cache.revalidate(
+            key,
+            lambda: refresh(route, key, url, params, stale)
+        )
+        return entry
+    try:
+        entry = await refresh(route, key, url, params, entry)
+    except HTTPException as e:
+        if entry is None or e.status_code < 500:
+            raise
+        log.warning(f"Serving stale {route.name} response: {e.detail}")
+    return entry
+
+
+async def cached_forward(
+    route: ProxyRoute,
+    request: Request,
+    url: str,
+    params: Dict[str, Any]
+) -> Response:
+    entry = await cached_entry(route, url, params)
+    return cached_response(route, entry, request)
+
+
+async def fetch(name: str, **path_params: str) -> Any:
+    """Resolve a declared GET route for gateway-side composition
+
+    Goes through the same response cache and upstream coalescing as the
+    route endpoint and returns the decoded JSON body.
+    """
+    route = registry[name]
+    url = format_path(route.upstream_path or route.path, path_params)
+    if route.cache_ttl is not None:
+        content = (await cached_entry(route, url, {})).content
+    else:
+        upstream = get_upstream(route.upstream)
+        request = upstream.build_request(route.forwarded_method, url)
+        response = await send(route, request)
+        content = response.content
+    return loads(content) if content else None
+
+
+async def resolve(name: str, **path_params: str) -> Tuple[Any, Optional[dict]]:
+    """Like ``fetch`` but reports upstream errors instead of raising them
+
+    Bodies that are not JSON or fail the route's response model are
+    reported as a 502 for that document only.
+    """
+    try:
+        return await fetch(name, **path_params), None
+    except HTTPException as e:
+        return None, {"status_code": e.status_code, "detail": e.detail}
+    except (ValidationError, ValueError) as e:
+        log.warning(f"Invalid {name} document for {path_params}: {e}")
+        return None, {
+            "status_code": status.HTTP_502_BAD_GATEWAY,
+            "detail": f"Invalid {name} document from upstream",
+        }
+
+
+async def gather_limited(calls: Iterable[Awaitable], limit: int) -> List:
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(call: Awaitable):
+        async with semaphore:
+            return await call
+
+    return await asyncio.gather(*(run(call) for call in calls))
+
+
+async def invalidate(
+    route: ProxyRoute,
+    path_params: Dict[str, str],
+    body: Optional[BaseModel],
+    response: httpx.Response
+):
+    values = dict(path_params)
+    if body is not None:
+        values.update({
+            model_field.alias: getattr(body, name)
+            for name, model_field in body.__fields__.items()
+        })
+    try:
+        payload = response.json() if response.content else None
+    except ValueError:
+        payload = None
+    if isinstance(payload, dict):
+        values.update(payload)
+    for template in route.invalidates:
+        try:
+            url = format_path(template, values)
+        except KeyError:
+            continue
+        await response_cache.invalidate(cache_key(route.upstream, url, {}))
+
+
+async def forward(
+    route: ProxyRoute,
+    request: Request,
+    path_params: Dict[str, str],
+    query: Dict[str, Any],
+    body: Optional[BaseModel] = None
+) -> Any:
+    upstream = get_upstream(route.upstream)
+    url = format_path(route.upstream_path or route.path, path_params)
+    params = {key: value for key, value in query.items() if value is not None}
+    if route.local is not None:
+        content = route.local(params)
+        if content is not None:
+            try:
+                return Response(
+                    content=render(route, content),
+                    media_type="application/json"
+                )
+            except ValidationError as e:
+                log.warning(f"Invalid local {route.name} answer: {e}")
+    if route.cache_ttl is not None:
+        return await cached_forward(route, request, url, params)
+    if body is None:
+        content = None
+    elif route.forwards_raw_body:
+        content = await request.body()
+    else:
+        content = encode_body(body)
+    upstream_request = upstream.build_request(
+        route.forwarded_method,
+        url,
+        params=params,
+        content=content,
+        headers=JSON_HEADERS if content is not None else None
+    )
+    if route.stream and conf.upstream_streaming:
+        response = await send(route, upstream_request, stream=True)
+        return relay(response, request)
+    response = await send(route, upstream_request)
+    if route.invalidates:
+        await invalidate(route, path_params, body, response)
+    if route.on_write is not None:
+        route.on_write()
+    if not response.content:
+        return Response(status_code=response.status_code)
+    return Response(
+        content=render(route, response.content),
+        status_code=response.status_code,
+        media_type="application/json"
+    )
+
+
+def create_endpoint(route: ProxyRoute):
+    path_names = route.path_params
+
+    async def endpoint(request: Request, **kwargs):
+        body = kwargs.pop("body", None)
+        path_params = {name: kwargs.pop(name) for name in path_names}
+        return await forward(route, request, path_params, kwargs, body)
+
+    parameters = [
+        Parameter("request", Parameter.KEYWORD_ONLY, annotation=Request)
+    ]
+    parameters.extend(
+        Parameter(name, Parameter.KEYWORD_ONLY, annotation=str)
+        for name in path_names
+    )
+    for name, default in route.query.items():
+        parameters.append(Parameter(
+            name,
+            Parameter.KEYWORD_ONLY,
+            annotation=str if default is ... else Optional[str],
+            default=Query(default)
+        ))
+    if route.body is not None:
+        parameters.append(Parameter(
+            "body",
+            Parameter.KEYWORD_ONLY,
+            annotation=route.body
+        ))
+    endpoint.__signature__ = Signature(parameters)
+    endpoint.__name__ = route.name
+    return endpoint
+
+
+def build_router(routes: Sequence[ProxyRoute], **kwargs) -> APIRouter:
+    router = APIRouter(**kwargs)
+    for route in routes:
+        registry[route.name] = route
+        dependencies = [Depends(get_current_user)] if route.auth else None
+        router.add_api_route(
+            route.path,
+            create_endpoint(route),
+            methods=[route.method],
+            name=route.name,
+            response_model=route.response_model,
+            response_description=route.response_description,
+            dependencies=dependencies,
+        )
+    return router
+
+
+def add_batch_routes(
+    router: APIRouter,
+    path: str,
+    route_name: str,
+    param: str
+):
+    """Register GET and POST ``{path}:batchGet`` lookups for a GET route
+
+    Ids are deduplicated keeping their first position, served through
+    ``fetch`` concurrently and answered in request order, failed ids are
+    reported in ``errors``. Ids that could leave their path segment
+    (``/``, ``?``, ``#``, ``..``) are rejected.
+
+    The lookups live on ``{path}:batchGet`` rather than ``{path}?ids=``
+    because GET and POST on the collections already belong to the name
+    searches and to creation.
+    """
+
+    async def batch_get(ids: List[str]) -> BatchResponse:
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > conf.batch_max_ids:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"At most {conf.batch_max_ids} ids per request"
+            )
+        unsafe = [id_ for id_ in ids if UNSAFE_ID.search(id_)]
+        if unsafe:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Invalid ids: {unsafe}"
+            )
+        results = await gather_limited(
+            (resolve(route_name, **{param: id_}) for id_ in ids),
+            conf.fanout_concurrency
+        )
+        return BatchResponse(
+            ids=ids,
+            items=[value for value, _ in results],
+            errors={
+                id_: error
+                for id_, (_, error) in zip(ids, results)
+                if error is not None
+            }
+        )
+
+    async def batch_get_query(ids: List[str] = Query(...)) -> BatchResponse:
+        return await batch_get(ids)
+
+    async def batch_get_body(batch: BatchRequest) -> BatchResponse:
+        return await batch_get(batch.ids)
+
+    endpoints = (("GET", batch_get_query), ("POST", batch_get_body))
+    for method, endpoint in endpoints:
+        name = f"batch_{route_name}_{method.lower()}"
+        endpoint.__name__ = name
+        router.add_api_route(
+            f"{path}:batchGet",
+            endpoint,
+            methods=[method],
+            name=name,
+            response_model=BatchResponse,
+            dependencies=[Depends(get_current_user)],
+        )
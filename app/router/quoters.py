@@ -1,15 +1,21 @@
-import logging
-from typing import Annotated, Optional, List
-
-from app.config import Configuration
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import get_settings
+from app.infra.upstream import QUOTER
+from app.router.proxy import (
+    ProxyRoute,
+    build_router,
+    fetch,
+    gather_limited,
+    resolve,
+)
 from app.router.security import get_current_user
 from app.domain.entities import QuoterModel, QuoterIdModel, QuoterUpdateModel
 
-import requests
-from fastapi import Depends, APIRouter, HTTPException, Response
-from fastapi.encoders import jsonable_encoder
+from fastapi import Depends, HTTPException, status
+from pydantic import ValidationError
 
-log = logging.getLogger(__name__)
+conf = get_settings()
 
 responses = {
     "401": {
@@ -20,123 +26,132 @@ responses = {
     },
 }
 
-router = APIRouter(
+ROUTES = [
+    ProxyRoute(
+        name="search_quoter_by_content",
+        method="GET",
+        path="/api/v1/quoters",
+        upstream=QUOTER,
+        query={"content": None},
+        response_model=List[QuoterModel],
+        stream=True,
+        hedge=True,
+        retries=2,
+    ),
+    ProxyRoute(
+        name="get_quoter",
+        method="GET",
+        path="/api/v1/quoters/{quoter_id}",
+        upstream=QUOTER,
+        cache_ttl=10,
+        stale_ttl=30,
+        hedge=True,
+        retries=2,
+    ),
+    ProxyRoute(
+        name="insert_quoter",
+        method="POST",
+        path="/api/v1/quoters",
+        upstream=QUOTER,
+        body=QuoterModel,
+        response_model=QuoterModel,
+        response_description="Add new quoter",
+        invalidates=("/api/v1/quoters/{_id}",),
+    ),
+    ProxyRoute(
+        name="create_sell",
+        method="POST",
+        path="/api/v1/sales",
+        upstream=QUOTER,
+        body=QuoterIdModel,
+        response_description="Add new sale",
+        invalidates=("/api/v1/quoters/{id}",),
+    ),
+    ProxyRoute(
+        name="update_quoter",
+        method="PATCH",
+        path="/api/v1/quoters/{quoter_id}",
+        upstream=QUOTER,
+        body=QuoterUpdateModel,
+        invalidates=("/api/v1/quoters/{quoter_id}",),
+    ),
+]
+
+router = build_router(
+    ROUTES,
     tags=["quoters"],
     responses=responses,
 )
 
-conf = Configuration()
-UserDeps = Annotated[bool, Depends(get_current_user)]
-
-QUOTER_URL = conf.quoter_url
-
-
-@router.get("/api/v1/quoters", response_model=List[QuoterModel])
-async def search_quoter_by_content(
-    user_validation: UserDeps,
-    content: Optional[str] = None
-):
-    url = f"{QUOTER_URL}/api/v1/quoters?content={content}"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-    except Exception as e:
-        log.error(f"Could not get data from quoters: {e}")
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=response.text
-        )
-    if not response.text:
-        raise HTTPException(
-            status_code=response.status_code
-        )
-    return response.json()
-
-
-@router.get("/api/v1/quoters/{quoter_id}")
-async def get_quoter(quoter_id: str, user_validation: UserDeps):
-    url = f"{QUOTER_URL}/api/v1/quoters/{quoter_id}"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-    except Exception as e:
-        log.error(f"Could not get data from quoters: {e}")
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=response.json().get("detail")
-        )
-    if not response.text:
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=response.text
-        )
-    return response.json()
-
-
-@router.post(
-        "/api/v1/quoters",
-        response_description="Add new quoter",
-        response_model=QuoterModel)
-async def insert_quoter(quoter: QuoterModel, user_validation: UserDeps):
-    url = f"{QUOTER_URL}/api/v1/quoters"
-    try:
-        response = requests.post(url, json=jsonable_encoder(quoter))
-        response.raise_for_status()
-    except Exception as e:
-        log.error(f"Could not post data to quoters: {e}")
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=response.json().get("detail")
-        )
-    if not response.text:
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=response.text
-        )
-    return response.json()
+LINKED = {
+    "client": ("get_client", "client_id"),
+    "products": ("get_product", "product_id"),
+    "services": ("get_service", "service_id"),
+}
 
 
-@router.post(
-        "/api/v1/sales",
-        response_description="Add new sale"
-)
-async def create_sell(quoter: QuoterIdModel, user_validation: UserDeps):
-    url = f"{QUOTER_URL}/api/v1/sales"
-    try:
-        response = requests.post(url, json=jsonable_encoder(quoter))
-        response.raise_for_status()
-    except Exception as e:
-        log.error(f"Could not post data to sales: {e}")
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=response.json().get("detail")
-        )
-    if not response.text:
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=response.text
-        )
-    return response.json()
+def linked_id(document: Any) -> Optional[str]:
+    """Id of an embedded document, None when it can't be resolved"""
+    if not isinstance(document, dict):
+        return None
+    document_id = document.get("_id")
+    return document_id if isinstance(document_id, str) else None
 
 
-@router.patch("/api/v1/quoters/{quoter_id}")
-async def update_quoter(
-    quoter_id: str,
-    quoter: QuoterUpdateModel,
-    user_validation: UserDeps
-):
-    url = f"{QUOTER_URL}/api/v1/quoters/{quoter_id}"
+@router.get(
+        "/api/v1/quoters/{quoter_id}/expanded",
+        response_description="Quoter with its current client, products "
+                             "and services",
+        dependencies=[Depends(get_current_user)])
+async def get_expanded_quoter(quoter_id: str):
     try:
-        response = requests.patch(url, json=jsonable_encoder(quoter))
-        response.raise_for_status()
-    except Exception as e:
-        log.error(f"Could not patch data to quoters: {e}")
+        quoter = await fetch("get_quoter", quoter_id=quoter_id)
+    except (ValidationError, ValueError):
+        quoter = None
+    if not isinstance(quoter, dict):
         raise HTTPException(
-            status_code=response.status_code,
-            detail=response.json().get("detail")
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Quoter service returned an invalid quoter"
         )
-    if not response.text:
-        return Response(
-            status_code=response.status_code
+    client = quoter.get("client")
+    if not isinstance(client, dict):
+        client = {}
+    items = {
+        field: quoter.get(field) if isinstance(quoter.get(field), list) else []
+        for field in ("products", "services")
+    }
+    wanted: Dict[Tuple[str, str], Tuple[str, str]] = {}
+    if linked_id(client):
+        wanted[("client", linked_id(client))] = LINKED["client"]
+    for field, documents in items.items():
+        for document in documents:
+            if linked_id(document):
+                wanted[(field, linked_id(document))] = LINKED[field]
+    results = await gather_limited(
+        (
+            resolve(name, **{param: document_id})
+            for (_, document_id), (name, param) in wanted.items()
+        ),
+        conf.fanout_concurrency
+    )
+    resolved = dict(zip(wanted, results))
+    errors = {}
+
+    def merge(path: str, field: str, document: Any) -> Any:
+        value, error = resolved.get(
+            (field, linked_id(document)),
+            (None, None)
         )
-    return response.json()
+        if error is not None:
+            errors[path] = error
+        return value if value is not None else document
+
+    if client:
+        quoter["client"] = merge("client", "client", client)
+    for field, documents in items.items():
+        quoter[field] = [
+            merge(f"{field}.{index}", field, document)
+            for index, document in enumerate(documents)
+        ]
+    quoter["errors"] = errors
+    return quoter
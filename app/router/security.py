@@ -7,16 +7,27 @@ from app.errors import (
     DBError,
     UserNotFoundException,
     PasswordNotMatchedException,
+    ServiceOverloadedError,
 )
+from app.config import get_settings
 from app.depends import get_gateway
 from app.adapters.gateway_i import GatewayInterface
 from app.schemas import Token
+from app.timing import AUTH, timed
 
-from fastapi import Depends, APIRouter, HTTPException, status, Request
+from fastapi import (
+    Depends,
+    APIRouter,
+    Form,
+    HTTPException,
+    status,
+    Request,
+)
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 
 
 log = logging.getLogger(__name__)
+conf = get_settings()
 
 responses = {
     "401": {
@@ -37,9 +48,10 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/token")
 async def get_current_user(
         token: Annotated[str, Depends(oauth2_scheme)],
         gateway: Annotated[GatewayInterface, Depends(get_gateway)]
-) -> bool:
+) -> str:
     try:
-        await gateway.validate_user_token(token)
+        with timed(AUTH):
+            username = await gateway.validate_user_token(token)
     except (UserNotFoundException, EmptyDataError, CorruptedTokenError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -51,20 +63,55 @@ async def get_current_user(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Could not connect to other services"
         )
-    return True
+    return username
+
+
+async def get_admin_user(
+        username: Annotated[str, Depends(get_current_user)]
+) -> str:
+    if username not in conf.profiling_admins:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    return username
+
 
+async def is_admin_request(
+    request: Request,
+    gateway: GatewayInterface
+) -> bool:
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        username = await gateway.validate_user_token(token)
+    except (
+        UserNotFoundException,
+        EmptyDataError,
+        CorruptedTokenError,
+        DBError,
+    ):
+        return False
+    return username in conf.profiling_admins
 
-@router.post("/api/v1/token", response_model=Token)
+
+@router.post(
+    "/api/v1/token",
+    response_model=Token,
+    response_model_exclude_none=True
+)
 async def login_for_access_token(
     request: Request,
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     gateway: Annotated[GatewayInterface, Depends(get_gateway)]
 ):
     try:
-        user = await gateway.authenticate_user(
-            form_data.username,
-            form_data.password
-        )
+        with timed(AUTH):
+            user = await gateway.authenticate_user(
+                form_data.username,
+                form_data.password
+            )
     except (UserNotFoundException, PasswordNotMatchedException):
         log.error("User not match")
         raise HTTPException(
@@ -72,6 +119,52 @@ async def login_for_access_token(
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    except ServiceOverloadedError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts in progress, try again later",
+            headers={"Retry-After": "1"},
+        )
     return await gateway.create_acces_token(
         user
     )
+
+
+@router.post(
+    "/api/v1/token/refresh",
+    response_model=Token,
+    response_model_exclude_none=True
+)
+async def refresh_access_token(
+    refresh_token: Annotated[str, Form()],
+    gateway: Annotated[GatewayInterface, Depends(get_gateway)]
+):
+    try:
+        with timed(AUTH):
+            return await gateway.refresh_access_token(refresh_token)
+    except (UserNotFoundException, EmptyDataError, CorruptedTokenError):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    except DBError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Could not connect to other services"
+        )
+
+
+@router.delete(
+    "/api/v1/admin/users/{username}/cache",
+    status_code=status.HTTP_204_NO_CONTENT,
+    tags=["admin"],
+    dependencies=[Depends(get_admin_user)],
+    responses={"403": {"description": "Not an admin"}},
+)
+async def invalidate_cached_user(
+    username: str,
+    gateway: Annotated[GatewayInterface, Depends(get_gateway)]
+):
+    """Forget a user validated recently, after it changed or was removed"""
+    await gateway.invalidate_user(username)
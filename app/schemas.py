@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import TypedDict
+from typing import Any, Dict, List, Optional, TypedDict
 
 from pydantic import BaseModel
 
@@ -17,8 +17,41 @@ class UserDict(TypedDict):
 class TokenToEncode(TypedDict):
     sub: str
     exp: datetime
+    type: str
 
 
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
+
+
+class BatchRequest(BaseModel):
+    ids: List[str]
+
+
+class BatchResponse(BaseModel):
+    ids: List[str]
+    items: List[Optional[Any]]
+    errors: Dict[str, Any]
+
+
+class ProfileSummary(BaseModel):
+    id: str
+    label: str
+    started_at: float
+    duration: float
+    samples: int
+
+
+class HotFunction(BaseModel):
+    function: str
+    self: int
+    total: int
+    self_percent: float
+    total_percent: float
+
+
+class ProfileReport(ProfileSummary):
+    top: List[HotFunction]
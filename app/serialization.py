@@ -0,0 +1,76 @@
+import json
+import logging
+from typing import Any
+
+from app.config import get_settings
+
+from bson import ObjectId
+from pydantic import BaseModel
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+conf = get_settings()
+log = logging.getLogger(__name__)
+
+if conf.json_backend == "orjson" and orjson is None:
+    log.warning("orjson is not installed, using the stdlib JSON backend")
+USE_ORJSON = conf.json_backend == "orjson" and orjson is not None
+
+
+def encode(value: Any) -> Any:
+    """``default`` hook for orjson mirroring ``jsonable_encoder``
+
+    Models are dumped by alias, nested values are left to orjson which
+    already writes datetimes in ISO format, ``ObjectId`` becomes its hex
+    string like the models' ``json_encoders`` do. Anything else, including
+    models with other custom encoders, goes through ``jsonable_encoder``.
+    """
+    if isinstance(value, BaseModel):
+        encoders = getattr(value.__config__, "json_encoders", {})
+        if any(kind is not ObjectId for kind in encoders):
+            return jsonable_encoder(value)
+        content = value.dict(by_alias=True)
+        return content["__root__"] if "__root__" in content else content
+    if isinstance(value, ObjectId):
+        return str(value)
+    return jsonable_encoder(value)
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON with the same output as FastAPI's responses
+
+    Floats may differ lexically (``1e16`` against ``1e+16``) but never in
+    value and NaN is written as ``null``. Payloads orjson refuses, like
+    integers over 64 bits, are encoded with the stdlib instead.
+    """
+    if USE_ORJSON:
+        try:
+            return orjson.dumps(
+                value,
+                default=encode,
+                option=orjson.OPT_NON_STR_KEYS
+            )
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(
+        jsonable_encoder(value),
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode()
+
+
+def loads(content: Any) -> Any:
+    if USE_ORJSON:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,149 @@
+import os
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from app import depends
+from app.config import get_settings
+from app.errors import DBError
+from app.infra.upstream import SERVICE, UPSTREAMS
+from app.metrics import STARTUP_SECONDS
+
+import httpx
+from fastapi import FastAPI
+
+conf = get_settings()
+log = logging.getLogger(__name__)
+
+imported_at = time.time()
+
+
+def process_started_at() -> float:
+    """Wall clock start of this process, import time when /proc is missing"""
+    try:
+        with open("/proc/self/stat") as stat:
+            ticks = int(stat.read().rpartition(")")[2].split()[19])
+        with open("/proc/stat") as system:
+            boot = next(
+                int(line.split()[1]) for line in system
+                if line.startswith("btime")
+            )
+    except (OSError, ValueError, IndexError, StopIteration):
+        return imported_at
+    return boot + ticks / os.sysconf("SC_CLK_TCK")
+
+
+@dataclass
+class StartupState:
+    ready: bool = False
+    phases: Dict[str, float] = field(default_factory=dict)
+
+    def record(self, phase: str, seconds: float):
+        self.phases[phase] = round(seconds, 4)
+        STARTUP_SECONDS.labels(phase).set(seconds)
+
+
+state = StartupState()
+
+
+async def preopen_upstream(name: str, connections: int):
+    upstream = depends.get_upstream(name)
+    await asyncio.gather(*(
+        upstream.get(conf.upstream_probe_path, timeout=conf.health_timeout)
+        for _ in range(connections)
+    ))
+
+
+async def prime_catalog():
+    if conf.catalog_index_enabled:
+        await depends.catalog.sync(depends.get_upstream(SERVICE))
+
+
+async def ensure_indexes():
+    """Best effort, lookups still work without the index, only slower"""
+    try:
+        await depends.repo.ensure_indexes()
+    except DBError as e:
+        log.warning(str(e))
+
+
+async def warmup(app: FastAPI):
+    """Open pools, load lazy backends and fill caches before traffic
+
+    Every step is best effort, a failing dependency is logged and left
+    to the readiness probe.
+    """
+    steps = {
+        **{
+            f"upstream:{name}": preopen_upstream(
+                name,
+                conf.warmup_connections
+            )
+            for name in UPSTREAMS
+        },
+        "mongo": depends.repo.ping(),
+        "passwords": depends.repo.verifier.warm(),
+        "catalog": prime_catalog(),
+    }
+    results = await asyncio.gather(*steps.values(), return_exceptions=True)
+    for step, result in zip(steps, results):
+        if isinstance(result, Exception):
+            log.warning(f"Warmup step {step} failed: {result}")
+    app.openapi()
+
+
+async def start(app: FastAPI):
+    started_at = time.time()
+    state.record("boot", started_at - process_started_at())
+    if conf.db_ensure_indexes:
+        await ensure_indexes()
+        state.record("indexes", time.time() - started_at)
+    if conf.warmup_enabled:
+        warmup_started_at = time.time()
+        await warmup(app)
+        state.record("warmup", time.time() - warmup_started_at)
+    depends.start_catalog_sync()
+    depends.start_revocation_sync()
+    depends.start_invalidation_listener()
+    state.ready = True
+    state.record("total", time.time() - process_started_at())
+    log.info(f"Gateway ready in {state.phases['total']:.3f}s")
+
+
+async def check(probe) -> Dict:
+    started_at = time.perf_counter()
+    error: Optional[str] = None
+    try:
+        await asyncio.wait_for(probe, conf.health_timeout)
+    except asyncio.TimeoutError:
+        error = "timeout"
+    except Exception as e:
+        error = str(e) or type(e).__name__
+    result = {
+        "ok": error is None,
+        "latency_ms": round(1000 * (time.perf_counter() - started_at), 3),
+    }
+    if error is not None:
+        result["error"] = error
+    return result
+
+
+async def probe_upstream(name: str):
+    response = await depends.get_upstream(name).get(conf.upstream_probe_path)
+    if response.status_code >= 500:
+        raise httpx.HTTPStatusError(
+            f"Answered {response.status_code}",
+            request=response.request,
+            response=response
+        )
+
+
+async def readiness() -> Dict[str, Dict]:
+    probes = {name: probe_upstream(name) for name in UPSTREAMS}
+    probes["mongo"] = depends.repo.ping()
+    results = await asyncio.gather(*(
+        check(probe) for probe in probes.values()
+    ))
+    return dict(zip(probes, results))
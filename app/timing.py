@@ -0,0 +1,43 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+AUTH = "auth"
+UPSTREAM = "upstream"
+SERIALIZE = "serialize"
+PHASES = (AUTH, UPSTREAM, SERIALIZE)
+
+request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "request_timings",
+    default=None
+)
+
+
+def start_timings() -> Dict[str, float]:
+    timings: Dict[str, float] = defaultdict(float)
+    request_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """Add the time spent in the block to the current request's phase"""
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = request_timings.get()
+        if timings is not None:
+            timings[phase] += time.perf_counter() - started_at
+
+
+def server_timing(timings: Dict[str, float], total: float) -> str:
+    entries = [
+        f"{phase};dur={timings[phase] * 1000:.1f}"
+        for phase in PHASES
+        if phase in timings
+    ]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
@@ -0,0 +1,81 @@
+"""Compression benchmark for quoter list payloads
+
+Compresses a rendered ``List[QuoterModel]`` body with every coding the
+gateway can negotiate at a few levels and reports the compressed size,
+ratio and best time per call, to pick ``COMPRESSION_LEVEL`` and
+``BROTLI_QUALITY``.
+
+    python -m bench.compression --quotes 50 --products 200
+"""
+import os
+import json
+import zlib
+import argparse
+from typing import Callable, Dict
+
+from bench import payloads
+from bench.encoding import best_of
+from bench.run import ENVIRONMENT
+
+for key, value in ENVIRONMENT.items():
+    os.environ.setdefault(key, value)
+
+from app.compression import brotli  # noqa: E402
+
+
+def gzip_at(level: int) -> Callable[[bytes], bytes]:
+    def encode(content: bytes) -> bytes:
+        encoder = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return encoder.compress(content) + encoder.flush()
+    return encode
+
+
+def brotli_at(quality: int) -> Callable[[bytes], bytes]:
+    def encode(content: bytes) -> bytes:
+        return brotli.compress(content, quality=quality)
+    return encode
+
+
+def measure(
+    encode: Callable[[bytes], bytes],
+    content: bytes,
+    repeat: int
+) -> Dict:
+    compressed = encode(content)
+    return {
+        "bytes": len(compressed),
+        "ratio": round(len(content) / len(compressed), 2),
+        "ms": round(1000 * best_of(lambda: encode(content), repeat), 3),
+    }
+
+
+def main(args: argparse.Namespace) -> Dict:
+    content = json.dumps([
+        payloads.quoter(position, args.products, args.services)
+        for position in range(args.quotes)
+    ], separators=(",", ":")).encode()
+    encoders = {f"gzip-{level}": gzip_at(level) for level in (1, 6, 9)}
+    if brotli is not None:
+        encoders.update({
+            f"br-{quality}": brotli_at(quality) for quality in (1, 4, 6, 11)
+        })
+    return {
+        "settings": vars(args),
+        "identity_bytes": len(content),
+        "encodings": {
+            name: measure(encode, content, args.repeat)
+            for name, encode in encoders.items()
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--quotes", type=int, default=50)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--services", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    print(json.dumps(main(parser.parse_args()), indent=2))
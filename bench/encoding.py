@@ -0,0 +1,108 @@
+"""JSON encoding benchmark for quoter payloads
+
+Compares ``jsonable_encoder`` + stdlib ``json`` (the FastAPI default) with
+``app.serialization`` on the two hot paths: rendering a validated
+``List[QuoterModel]`` upstream response and encoding a ``QuoterModel``
+request body. Reports the best time per call and whether both paths
+produced the same bytes (request bodies used to keep the stdlib spacing)
+and the same JSON value.
+
+    python -m bench.encoding --quotes 50 --products 200
+"""
+import os
+import json
+import timeit
+import argparse
+from typing import Any, Callable, Dict, List
+
+from bench import payloads
+from bench.run import ENVIRONMENT
+
+for key, value in ENVIRONMENT.items():
+    os.environ.setdefault(key, value)
+os.environ.setdefault("QUOTER_URL", "http://127.0.0.1")
+os.environ.setdefault("CLIENT_URL", "http://127.0.0.1")
+os.environ.setdefault("SERVICE_URL", "http://127.0.0.1")
+
+from app import serialization  # noqa: E402
+from app.domain.entities import QuoterModel  # noqa: E402
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from pydantic import parse_raw_as  # noqa: E402
+
+
+def stdlib_dumps(value: Any) -> bytes:
+    return json.dumps(
+        jsonable_encoder(value),
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode()
+
+
+def best_of(call: Callable[[], Any], repeat: int) -> float:
+    number, _ = timeit.Timer(call).autorange()
+    return min(timeit.repeat(call, number=number, repeat=repeat)) / number
+
+
+def compare(
+    current: Callable[[], bytes],
+    candidate: Callable[[], bytes],
+    repeat: int
+) -> Dict:
+    current_seconds = best_of(current, repeat)
+    candidate_seconds = best_of(candidate, repeat)
+    return {
+        "current_ms": round(1000 * current_seconds, 3),
+        "candidate_ms": round(1000 * candidate_seconds, 3),
+        "speedup": round(current_seconds / candidate_seconds, 2),
+        "identical": current() == candidate(),
+        "equivalent": json.loads(current()) == json.loads(candidate()),
+    }
+
+
+def main(args: argparse.Namespace) -> Dict:
+    upstream = json.dumps([
+        payloads.quoter(position, args.products, args.services)
+        for position in range(args.quotes)
+    ]).encode()
+    quotes: List[QuoterModel] = parse_raw_as(List[QuoterModel], upstream)
+    body = quotes[0]
+    return {
+        "backend": "orjson" if serialization.USE_ORJSON else "stdlib",
+        "settings": vars(args),
+        "upstream_bytes": len(upstream),
+        "render_list": compare(
+            lambda: stdlib_dumps(
+                parse_raw_as(List[QuoterModel], upstream)
+            ),
+            lambda: serialization.dumps(parse_raw_as(
+                List[QuoterModel],
+                upstream,
+                json_loads=serialization.loads
+            )),
+            args.repeat
+        ),
+        "dump_list": compare(
+            lambda: stdlib_dumps(quotes),
+            lambda: serialization.dumps(quotes),
+            args.repeat
+        ),
+        "encode_body": compare(
+            lambda: json.dumps(jsonable_encoder(body)).encode(),
+            lambda: serialization.dumps(body),
+            args.repeat
+        ),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--quotes", type=int, default=50)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--services", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    print(json.dumps(main(parser.parse_args()), indent=2))
@@ -0,0 +1,150 @@
+"""Fake quoter, client and product/service upstream
+
+Serves the upstream API the gateway proxies with pre-serialized payloads
+so the fake itself costs as little as possible, each answer is delayed by
+``--latency`` seconds (+/- 50%).
+
+    python -m bench.fakes --port 8101 --latency 0.02 --products 200
+"""
+import json
+import random
+import asyncio
+import argparse
+
+from bench import payloads
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+
+def create_app(
+    latency: float,
+    products: int,
+    services: int,
+    catalog: int,
+    results: int
+) -> Starlette:
+    product_catalog = [payloads.product(i) for i in range(catalog)]
+    service_catalog = [payloads.service(i) for i in range(catalog)]
+    quoter = json.dumps(payloads.quoter(0, products, services)).encode()
+    quoters = json.dumps([
+        payloads.quoter(i, 0, 0) for i in range(results)
+    ]).encode()
+    client = json.dumps(payloads.client(0)).encode()
+    clients = json.dumps([payloads.client(i) for i in range(results)]).encode()
+    product = json.dumps(product_catalog[0]).encode()
+    service = json.dumps(service_catalog[0]).encode()
+
+    def matching(docs, fields, term):
+        term = (term or "").lower()
+        found = [
+            doc for doc in docs
+            if any(
+                word.startswith(term)
+                for name in fields
+                for word in doc[name].lower().split()
+            )
+        ]
+        return json.dumps(found[:results]).encode()
+
+    async def answer(content: bytes, status_code: int = 200) -> Response:
+        if latency:
+            await asyncio.sleep(latency * random.uniform(0.5, 1.5))
+        return Response(
+            content,
+            status_code=status_code,
+            media_type="application/json"
+        )
+
+    async def echo(request: Request) -> Response:
+        return await answer(await request.body(), 201)
+
+    async def get_quoters(request: Request) -> Response:
+        return await answer(quoters)
+
+    async def get_quoter(request: Request) -> Response:
+        return await answer(quoter)
+
+    async def get_clients(request: Request) -> Response:
+        return await answer(clients)
+
+    async def get_client(request: Request) -> Response:
+        return await answer(client)
+
+    async def search_products(request: Request) -> Response:
+        return await answer(matching(
+            product_catalog,
+            ("title", "brand", "model"),
+            request.query_params.get("product_name")
+        ))
+
+    async def get_product(request: Request) -> Response:
+        return await answer(product)
+
+    async def search_services(request: Request) -> Response:
+        return await answer(matching(
+            service_catalog,
+            ("name",),
+            request.query_params.get("service_name")
+        ))
+
+    async def search_descriptions(request: Request) -> Response:
+        return await answer(matching(
+            service_catalog,
+            ("description",),
+            request.query_params.get("service_description")
+        ))
+
+    async def get_service(request: Request) -> Response:
+        return await answer(service)
+
+    return Starlette(routes=[
+        Route("/api/v1/quoters", get_quoters, methods=["GET"]),
+        Route("/api/v1/quoters", echo, methods=["POST"]),
+        Route("/api/v1/quoters/{quoter_id}", get_quoter, methods=["GET"]),
+        Route("/api/v1/quoters/{quoter_id}", echo, methods=["PATCH"]),
+        Route("/api/v1/sales", echo, methods=["POST"]),
+        Route("/api/v1/clients", get_clients, methods=["GET"]),
+        Route("/api/v1/clients", echo, methods=["POST"]),
+        Route("/api/v1/clients/{client_id}", get_client, methods=["GET"]),
+        Route("/api/v1/clients/{client_id}", echo, methods=["PATCH"]),
+        Route("/api/v1/products", search_products, methods=["GET"]),
+        Route("/api/v1/products", echo, methods=["POST"]),
+        Route("/api/v1/products/{product_id}", get_product, methods=["GET"]),
+        Route("/api/v1/services", search_services, methods=["GET"]),
+        Route("/api/v1/services", echo, methods=["POST"]),
+        Route(
+            "/api/v1/services/description",
+            search_descriptions,
+            methods=["GET"]
+        ),
+        Route("/api/v1/services/{service_id}", get_service, methods=["GET"]),
+        Route("/api/v1/services/{service_id}", echo, methods=["PATCH"]),
+    ])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--services", type=int, default=20)
+    parser.add_argument("--catalog", type=int, default=1000)
+    parser.add_argument("--results", type=int, default=20)
+    args = parser.parse_args()
+    uvicorn.run(
+        create_app(
+            args.latency,
+            args.products,
+            args.services,
+            args.catalog,
+            args.results
+        ),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+    )
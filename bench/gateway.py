@@ -0,0 +1,21 @@
+"""``app.main:app`` wired to the in-memory user store
+
+Imported by every uvicorn worker started by ``bench.serve``, the store
+settings come from ``BENCH_USERS`` and ``BENCH_BCRYPT_ROUNDS``.
+"""
+import os
+
+from app import depends
+from app.config import get_settings
+from app.main import app
+from bench.store import MemoryDatabase
+
+database = MemoryDatabase()
+database.seed(
+    get_settings().collection,
+    int(os.environ.get("BENCH_USERS", "50")),
+    int(os.environ.get("BENCH_BCRYPT_ROUNDS", "0")) or None
+)
+depends.repo.nosql_conn = database
+
+__all__ = ["app"]
@@ -0,0 +1,95 @@
+"""Minimal Redis-protocol store for running several replicas locally
+
+Understands just the commands the gateway cache backend sends (PING,
+AUTH, SELECT, GET, SET with PX, DEL, PUBLISH, SUBSCRIBE), enough to try
+shared caching and cross-replica invalidation without a Redis server.
+
+    python -m bench.kvstore --port 6390
+    CACHE_URL=redis://127.0.0.1:6390/0 python -m bench.serve --port 8100
+"""
+import time
+import asyncio
+import argparse
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.infra.cache_backends import encode_command
+
+values: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+channels: Dict[bytes, Set[asyncio.StreamWriter]] = {}
+
+
+def bulk(value: Optional[bytes]) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+async def read_command(reader: asyncio.StreamReader) -> List[bytes]:
+    header = await reader.readline()
+    if not header:
+        raise ConnectionError("Client left")
+    args = []
+    for _ in range(int(header[1:])):
+        size = int((await reader.readline())[1:])
+        args.append((await reader.readexactly(size + 2))[:-2])
+    return args
+
+
+def execute(args: List[bytes], writer: asyncio.StreamWriter) -> bytes:
+    command = args[0].upper()
+    if command == b"PING":
+        return b"+PONG\r\n"
+    if command in (b"AUTH", b"SELECT"):
+        return b"+OK\r\n"
+    if command == b"GET":
+        value, expires_at = values.get(args[1], (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            values.pop(args[1], None)
+            value = None
+        return bulk(value)
+    if command == b"SET":
+        expires_at = None
+        if len(args) == 5 and args[3].upper() == b"PX":
+            expires_at = time.monotonic() + int(args[4]) / 1000
+        values[args[1]] = (args[2], expires_at)
+        return b"+OK\r\n"
+    if command == b"DEL":
+        removed = sum(values.pop(key, None) is not None for key in args[1:])
+        return b":%d\r\n" % removed
+    if command == b"PUBLISH":
+        listeners = channels.get(args[1], set())
+        message = encode_command(b"message", args[1], args[2])
+        for listener in listeners:
+            listener.write(message)
+        return b":%d\r\n" % len(listeners)
+    if command == b"SUBSCRIBE":
+        channels.setdefault(args[1], set()).add(writer)
+        return b"*3\r\n%s%s:1\r\n" % (bulk(b"subscribe"), bulk(args[1]))
+    return b"-ERR unknown command %s\r\n" % command
+
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            writer.write(execute(await read_command(reader), writer))
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        for listeners in channels.values():
+            listeners.discard(writer)
+        writer.close()
+
+
+async def main(host: str, port: int):
+    server = await asyncio.start_server(handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    asyncio.run(main(args.host, args.port))
@@ -0,0 +1,80 @@
+import random
+from typing import Dict, List
+
+WORDS = (
+    "cable", "cadena", "camara", "candado", "canaleta", "capacitor",
+    "contacto", "control", "conector", "disco", "duplex", "fuente",
+    "gabinete", "interruptor", "lampara", "monitor", "panel", "poste",
+    "regulador", "router", "sensor", "switch", "tablero", "tubo",
+)
+BRANDS = ("Condumex", "Hikvision", "Dahua", "Steren", "Ubiquiti", "Phillips")
+
+
+def object_id(kind: int, position: int) -> str:
+    return f"{kind:08x}{position:016x}"
+
+
+def product(position: int) -> Dict:
+    rng = random.Random(position)
+    return {
+        "_id": object_id(1, position),
+        "title": " ".join(rng.sample(WORDS, 3)),
+        "list_price": round(rng.uniform(10, 5000), 2),
+        "discount_price": round(rng.uniform(10, 5000), 2),
+        "image": f"https://images.example.com/products/{position}.png",
+        "stock_number": rng.randint(0, 500),
+        "brand": rng.choice(BRANDS),
+        "product_id": position,
+        "model": f"M-{rng.randint(100, 999)}",
+        "sat_key": rng.randint(10000000, 99999999),
+        "weight": round(rng.uniform(0.1, 40), 2),
+    }
+
+
+def service(position: int) -> Dict:
+    rng = random.Random(-position)
+    return {
+        "_id": object_id(2, position),
+        "name": " ".join(rng.sample(WORDS, 2)),
+        "description": " ".join(rng.sample(WORDS, 6)),
+        "client_price": round(rng.uniform(100, 20000), 2),
+        "real_price": round(rng.uniform(100, 20000), 2),
+    }
+
+
+def client(position: int) -> Dict:
+    return {
+        "_id": object_id(3, position),
+        "name": f"Cliente {position}",
+        "location": "Ciudad de Mexico",
+        "email": f"cliente{position}@example.com",
+        "phone_number": 5550000000 + position,
+    }
+
+
+def quoter(position: int, products: int, services: int) -> Dict:
+    return {
+        "_id": object_id(4, position),
+        "name": f"Cotizacion {position}",
+        "date": "2023-07-01T12:00:00",
+        "subtotal": 1000.0,
+        "iva": 160.0,
+        "total": 1160.0,
+        "percentage_in_advance_pay": 50.0,
+        "revenue_percentage": 30.0,
+        "first_pay": 580.0,
+        "second_pay": 580.0,
+        "description": "Instalacion de " + " ".join(WORDS[:8]),
+        "client": client(position % 50),
+        "products": [product(i) for i in range(products)],
+        "services": [service(i) for i in range(services)],
+    }
+
+
+def search_terms() -> List[str]:
+    """Typeahead prefixes as typed, two to all letters of each word"""
+    return [
+        word[:length]
+        for word in WORDS
+        for length in range(2, len(word) + 1)
+    ]
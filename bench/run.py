@@ -0,0 +1,381 @@
+"""End-to-end load benchmark of the gateway
+
+Starts three fake upstreams and the gateway (with the in-memory user
+store) as subprocesses, then drives every scenario alone followed by the
+weighted mix. Latency percentiles, RPS and the gateway resident memory
+are written as JSON so runs can be diffed. ``--workers 1,2,4`` repeats
+the run for each worker count and adds a ``scaling`` summary of the mix.
+
+    python -m bench.run --duration 10 --concurrency 32 --output run.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import statistics
+import subprocess
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from bench import payloads
+from bench.store import PASSWORD, username
+
+import httpx
+
+Scenario = Callable[["Session"], Awaitable[Tuple[str, httpx.Response]]]
+
+ENVIRONMENT = {
+    "DB_HOST": "bench",
+    "DB_USER": "bench",
+    "DB_PASSWRD": "bench",
+    "DB_NAME": "bench",
+    "COLLECTION": "users",
+    "SECRET_KEY": "bench-secret",
+    "ALGORITHM": "HS256",
+    "EXPIRE_TIME": "60",
+}
+
+
+@dataclass
+class Session:
+    client: httpx.AsyncClient
+    users: int
+    tokens: Dict[str, str]
+    quote: bytes
+    terms: List[str] = field(default_factory=payloads.search_terms)
+
+    def headers(self) -> Dict[str, str]:
+        token = random.choice(list(self.tokens.values()))
+        return {"Authorization": f"Bearer {token}"}
+
+
+async def login(session: Session) -> Tuple[str, httpx.Response]:
+    response = await session.client.post("/api/v1/token", data={
+        "username": username(random.randrange(session.users)),
+        "password": PASSWORD,
+    })
+    return "POST /api/v1/token", response
+
+
+async def typeahead(session: Session) -> Tuple[str, httpx.Response]:
+    response = await session.client.get(
+        "/api/v1/products",
+        params={"product_name": random.choice(session.terms)},
+        headers=session.headers()
+    )
+    return "GET /api/v1/products", response
+
+
+async def open_quote(session: Session) -> Tuple[str, httpx.Response]:
+    quoter_id = payloads.object_id(4, random.randrange(1000))
+    response = await session.client.get(
+        f"/api/v1/quoters/{quoter_id}",
+        headers=session.headers()
+    )
+    return "GET /api/v1/quoters/{quoter_id}", response
+
+
+async def save_quote(session: Session) -> Tuple[str, httpx.Response]:
+    response = await session.client.post(
+        "/api/v1/quoters",
+        content=session.quote,
+        headers={**session.headers(), "Content-Type": "application/json"}
+    )
+    return "POST /api/v1/quoters", response
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "login": login,
+    "typeahead": typeahead,
+    "open_quote": open_quote,
+    "save_quote": save_quote,
+}
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """Resident memory of ``pid`` plus its children, like uvicorn workers"""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            rss = next(
+                int(line.split()[1]) * 1024 for line in status
+                if line.startswith("VmRSS:")
+            )
+        with open(f"/proc/{pid}/task/{pid}/children") as children:
+            child_pids = [int(child) for child in children.read().split()]
+    except (OSError, StopIteration):
+        return None
+    return rss + sum(rss_bytes(child) or 0 for child in child_pids)
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict:
+    summary = {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 2),
+    }
+    if not latencies:
+        return summary
+    samples = latencies if len(latencies) > 1 else latencies * 2
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        **summary,
+        "mean_ms": round(1000 * statistics.fmean(latencies), 3),
+        "p50_ms": round(1000 * cuts[49], 3),
+        "p95_ms": round(1000 * cuts[94], 3),
+        "p99_ms": round(1000 * cuts[98], 3),
+    }
+
+
+async def drive(
+    session: Session,
+    mix: Dict[str, float],
+    duration: float,
+    concurrency: int,
+    pid: int
+) -> Dict:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    deadline = time.monotonic() + duration
+    memory = [rss_bytes(pid)]
+
+    async def worker():
+        while time.monotonic() < deadline:
+            scenario = SCENARIOS[random.choices(names, weights)[0]]
+            started_at = time.perf_counter()
+            try:
+                endpoint, response = await scenario(session)
+                await response.aread()
+            except httpx.HTTPError:
+                errors["transport"] += 1
+                continue
+            latencies[endpoint].append(time.perf_counter() - started_at)
+            if response.status_code >= 400:
+                errors[endpoint] += 1
+
+    async def watch_memory():
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.25)
+            memory.append(rss_bytes(pid))
+
+    started_at = time.monotonic()
+    await asyncio.gather(
+        watch_memory(),
+        *(worker() for _ in range(concurrency))
+    )
+    elapsed = time.monotonic() - started_at
+    samples = [value for value in memory if value is not None]
+    return {
+        "mix": mix,
+        "elapsed": round(elapsed, 3),
+        "total": summarize(
+            [value for values in latencies.values() for value in values],
+            sum(errors.values()),
+            elapsed
+        ),
+        "endpoints": {
+            endpoint: summarize(values, errors[endpoint], elapsed)
+            for endpoint, values in sorted(latencies.items())
+        },
+        "transport_errors": errors["transport"],
+        "rss_bytes": {
+            "start": samples[0] if samples else None,
+            "peak": max(samples) if samples else None,
+            "end": samples[-1] if samples else None,
+        },
+    }
+
+
+def spawn(module: str, *args: str, env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", module, *args],
+        env=env,
+    )
+
+
+async def wait_ready(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"{url} did not start")
+                await asyncio.sleep(0.1)
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def bench_gateway(
+    args: argparse.Namespace,
+    env: Dict[str, str],
+    workers: int
+) -> Dict:
+    gateway = spawn(
+        "bench.serve",
+        "--port", str(args.port),
+        "--workers", str(workers),
+        "--users", str(args.users),
+        "--bcrypt-rounds", str(args.bcrypt_rounds or 0),
+        env=env
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        await wait_ready(f"{base_url}/health/live")
+        limits = httpx.Limits(
+            max_connections=args.concurrency,
+            max_keepalive_connections=args.concurrency
+        )
+        async with httpx.AsyncClient(
+            base_url=base_url,
+            limits=limits,
+            timeout=30.0
+        ) as client:
+            session = Session(
+                client=client,
+                users=args.users,
+                tokens={},
+                quote=json.dumps(
+                    payloads.quoter(0, args.products, args.services)
+                ).encode(),
+            )
+            for position in range(min(args.users, args.concurrency)):
+                response = await client.post("/api/v1/token", data={
+                    "username": username(position),
+                    "password": PASSWORD,
+                })
+                response.raise_for_status()
+                session.tokens[username(position)] = (
+                    response.json()["access_token"]
+                )
+            phases = {}
+            if not args.mix_only:
+                for name in args.mix:
+                    phases[name] = await drive(
+                        session,
+                        {name: 1.0},
+                        args.duration,
+                        args.concurrency,
+                        gateway.pid
+                    )
+            phases["mix"] = await drive(
+                session,
+                args.mix,
+                args.duration,
+                args.concurrency,
+                gateway.pid
+            )
+    finally:
+        gateway.terminate()
+        gateway.wait()
+    return phases
+
+
+async def main(args: argparse.Namespace) -> Dict:
+    env = {**ENVIRONMENT, **os.environ}
+    upstream_args = (
+        "--latency", str(args.latency),
+        "--products", str(args.products),
+        "--services", str(args.services),
+        "--catalog", str(args.catalog),
+        "--results", str(args.results),
+    )
+    processes = []
+    for offset, name in enumerate(("QUOTER", "CLIENT", "SERVICE"), 1):
+        port = args.port + offset
+        processes.append(spawn(
+            "bench.fakes",
+            "--port", str(port),
+            *upstream_args,
+            env=env
+        ))
+        env[f"{name}_URL"] = f"http://127.0.0.1:{port}"
+    runs = {}
+    try:
+        for offset in range(1, 4):
+            await wait_ready(f"http://127.0.0.1:{args.port + offset}")
+        for workers in args.workers:
+            runs[workers] = await bench_gateway(args, env, workers)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+    report = {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {
+            key: value for key, value in vars(args).items()
+            if key != "output"
+        },
+        "phases": runs[args.workers[0]],
+    }
+    if len(runs) > 1:
+        report["scaling"] = [
+            {"workers": workers, **phases["mix"]["total"]}
+            for workers, phases in runs.items()
+        ]
+        report["runs"] = {
+            str(workers): phases for workers, phases in runs.items()
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--services", type=int, default=20)
+    parser.add_argument("--catalog", type=int, default=1000)
+    parser.add_argument("--results", type=int, default=20)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--bcrypt-rounds", type=int, default=None)
+    parser.add_argument(
+        "--workers",
+        type=lambda value: [int(count) for count in value.split(",")],
+        default="1",
+        help="Comma separated gateway worker counts, one run each"
+    )
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default="login=5,typeahead=50,open_quote=35,save_quote=10",
+        help="Comma separated scenario=weight pairs"
+    )
+    parser.add_argument(
+        "--mix-only",
+        action="store_true",
+        help="Skip the per-scenario phases"
+    )
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+    report = json.dumps(asyncio.run(main(args)), indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(report + "\n")
+    else:
+        print(report)
@@ -0,0 +1,33 @@
+"""Serve the gateway with the in-memory user store
+
+The upstream URLs and the rest of the settings come from the environment
+as usual, only the Mongo database handle is replaced before the first
+query would create the Motor client. Workers, backlog, keep-alive, loop
+and parser follow the gateway settings (``WORKERS``...).
+
+    python -m bench.serve --port 8100 --users 50 --workers 2
+"""
+import os
+import argparse
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--bcrypt-rounds", type=int, default=0)
+    args = parser.parse_args()
+    os.environ.update({
+        "HOST": args.host,
+        "PORT": str(args.port),
+        "WORKERS": str(args.workers),
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+        "BENCH_USERS": str(args.users),
+        "BENCH_BCRYPT_ROUNDS": str(args.bcrypt_rounds),
+    })
+
+    from app.main import serve
+
+    serve("bench.gateway:app")
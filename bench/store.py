@@ -0,0 +1,80 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from passlib.context import CryptContext
+
+PASSWORD = "bench-password"
+
+
+def username(position: int) -> str:
+    return f"bench{position}"
+
+
+@dataclass
+class MemoryCollection:
+    """Dict-backed stand-in for the Motor users collection"""
+
+    documents: Dict[str, dict] = field(default_factory=dict)
+    indexes: Dict[str, dict] = field(default_factory=dict)
+
+    async def find_one(
+        self,
+        query: dict,
+        projection: Optional[dict] = None,
+        *args: Any,
+        **kwargs: Any
+    ):
+        document = self.documents.get(query.get("username"))
+        if document is None or not projection:
+            return document
+        return {
+            name: value for name, value in document.items()
+            if projection.get(name)
+        }
+
+    async def find(self, query: dict, *args: Any, **kwargs: Any):
+        for document in list(self.documents.values()):
+            yield document
+
+    async def index_information(self) -> Dict[str, dict]:
+        return self.indexes
+
+    async def create_index(self, key: str, **kwargs: Any) -> str:
+        name = kwargs.get("name", f"{key}_1")
+        self.indexes[name] = {"key": [(key, 1)], **kwargs}
+        return name
+
+
+@dataclass
+class MemoryDatabase:
+    """In-memory stand-in for the Motor database used by ``Repository``
+
+    Users are seeded with a real bcrypt hash so logins still pay the
+    password verification cost.
+    """
+
+    collections: Dict[str, MemoryCollection] = field(default_factory=dict)
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        return self.collections.setdefault(name, MemoryCollection())
+
+    @property
+    def client(self) -> "MemoryDatabase":
+        return self
+
+    async def command(self, name: str, *args: Any, **kwargs: Any) -> dict:
+        return {"ok": 1.0}
+
+    def close(self):
+        pass
+
+    def seed(self, collection: str, users: int, rounds: Optional[int] = None):
+        context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        options = {"rounds": rounds} if rounds else {}
+        hashed = context.hash(PASSWORD, **options)
+        for position in range(users):
+            name = username(position)
+            self[collection].documents[name] = {
+                "username": name,
+                "password": hashed,
+            }
@@ -0,0 +1,94 @@
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Set
+
+import httpx
+import pytest
+
+os.environ.update({
+    "DB_HOST": "localhost",
+    "DB_USER": "gateway",
+    "DB_PASSWRD": "gateway",
+    "DB_NAME": "cotizapp",
+    "COLLECTION": "users",
+    "SECRET_KEY": "secret",
+    "ALGORITHM": "HS256",
+    "EXPIRE_TIME": "30",
+    "QUOTER_URL": "http://quoter",
+    "CLIENT_URL": "http://client",
+    "SERVICE_URL": "http://service",
+    "UPSTREAM_COALESCING": "false",
+})
+
+from app import depends  # noqa: E402
+from app.main import app  # noqa: E402
+from app.errors import DBError, UserNotFoundException  # noqa: E402
+from app.infra.repository import Repository  # noqa: E402
+from app.infra.upstream import UPSTREAMS  # noqa: E402
+from app.router.security import get_current_user  # noqa: E402
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+
+class FakeUpstreams:
+    """Records upstream requests and answers them by path"""
+
+    def __init__(self):
+        self.calls = []
+        self.responses = {}
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.calls.append(request)
+        return self.responses.get(
+            request.url.path,
+            httpx.Response(404, json={"detail": "Not found"})
+        )
+
+
+@dataclass
+class FakeRepository(Repository):
+    """Repository keeping users in memory, passwords are stored as is"""
+
+    users: Dict[str, str] = field(default_factory=dict)
+    revoked: Set[str] = field(default_factory=set)
+    lookups: int = 0
+    available: bool = True
+
+    async def get_user(self, username: str):
+        self.lookups += 1
+        if not self.available:
+            raise DBError("Database is down")
+        if username not in self.users:
+            raise UserNotFoundException("Quoter not found in DB")
+        return {"username": username, "password": self.users[username]}
+
+    async def verify_password(self, form_pass: str, hashed_pass: str):
+        return form_pass == hashed_pass
+
+    async def get_revoked_users(self) -> Set[str]:
+        return set(self.revoked)
+
+
+@pytest.fixture
+def repo():
+    return FakeRepository(connect=lambda: None, users={"ana": "secret"})
+
+
+@pytest.fixture
+def upstreams():
+    fake = FakeUpstreams()
+    for name in UPSTREAMS:
+        depends.upstreams[name] = httpx.AsyncClient(
+            base_url=f"http://{name}",
+            transport=httpx.MockTransport(fake.handler)
+        )
+    yield fake
+    depends.upstreams.clear()
+    depends.response_cache.entries.clear()
+
+
+@pytest.fixture
+def client():
+    app.dependency_overrides[get_current_user] = lambda: "tester"
+    yield TestClient(app)
+    app.dependency_overrides.clear()
@@ -0,0 +1,107 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from jose import jwt
+
+from app.adapters.gateway import Gateway
+from app.config import get_settings
+from app.errors import CorruptedTokenError, UserNotFoundException
+from app.infra.repository import ACCESS, REFRESH
+from app.infra.revocations import Revocations
+
+
+@pytest.fixture
+def gateway(repo):
+    gateway = Gateway(repo, revocations=Revocations(), stateless=True)
+    asyncio.run(gateway.revocations.sync(repo))
+    return gateway
+
+
+def test_refresh_token_is_not_an_access_token(gateway, repo):
+    refresh = repo.encode_token("ana", REFRESH, 60)
+
+    with pytest.raises(CorruptedTokenError):
+        asyncio.run(gateway.validate_user_token(refresh))
+
+
+def test_access_token_cannot_refresh(gateway, repo):
+    access = repo.encode_token("ana", ACCESS, 60)
+
+    with pytest.raises(CorruptedTokenError):
+        asyncio.run(gateway.refresh_access_token(access))
+
+
+def test_refresh_issues_a_valid_access_token(gateway, repo):
+    refresh = repo.encode_token("ana", REFRESH, 60)
+
+    token = asyncio.run(gateway.refresh_access_token(refresh))
+
+    assert token.refresh_token == refresh
+    username = asyncio.run(gateway.validate_user_token(token.access_token))
+    assert username == "ana"
+
+
+def test_expired_access_token_is_rejected(gateway, repo):
+    expired = repo.encode_token("ana", ACCESS, -10)
+
+    with pytest.raises(CorruptedTokenError):
+        asyncio.run(gateway.validate_user_token(expired))
+
+
+def test_revoked_user_is_refused_everywhere(gateway, repo):
+    access = repo.encode_token("ana", ACCESS, 60)
+    refresh = repo.encode_token("ana", REFRESH, 60)
+    repo.revoked.add("ana")
+    asyncio.run(gateway.revocations.sync(repo))
+
+    with pytest.raises(UserNotFoundException):
+        asyncio.run(gateway.validate_user_token(access))
+    with pytest.raises(UserNotFoundException):
+        asyncio.run(gateway.refresh_access_token(refresh))
+    with pytest.raises(UserNotFoundException):
+        asyncio.run(gateway.authenticate_user("ana", "secret"))
+
+
+def test_fresh_revocations_skip_the_database(gateway, repo):
+    access = repo.encode_token("ana", ACCESS, 60)
+
+    assert asyncio.run(gateway.validate_user_token(access)) == "ana"
+    assert repo.lookups == 0
+
+
+def test_stale_revocations_check_the_database(gateway, repo):
+    access = repo.encode_token("ana", ACCESS, 60)
+    gateway.revocations.synced_at = time.monotonic() - 1000
+
+    assert asyncio.run(gateway.validate_user_token(access)) == "ana"
+    assert repo.lookups == 1
+
+    del repo.users["ana"]
+    gateway.user_cache.clear()
+    with pytest.raises(UserNotFoundException):
+        asyncio.run(gateway.validate_user_token(access))
+
+
+def test_token_without_type_is_an_access_token(gateway, repo):
+    conf = get_settings()
+    legacy = jwt.encode(
+        {"sub": "ana", "exp": datetime.utcnow() + timedelta(minutes=1)},
+        conf.secret_key,
+        algorithm=conf.algorithm
+    )
+
+    assert asyncio.run(gateway.validate_user_token(legacy)) == "ana"
+    with pytest.raises(CorruptedTokenError):
+        asyncio.run(gateway.refresh_access_token(legacy))
+
+
+def test_login_issues_access_and_refresh_tokens(gateway):
+    user = asyncio.run(gateway.authenticate_user("ana", "secret"))
+    token = asyncio.run(gateway.create_acces_token(user))
+
+    assert token.refresh_token is not None
+    assert token.expires_in == int(gateway.access_ttl)
+    username = asyncio.run(gateway.validate_user_token(token.access_token))
+    assert username == "ana"
@@ -0,0 +1,132 @@
+import asyncio
+import contextlib
+
+import pytest
+
+from bench import kvstore
+from app.errors import CacheBackendError
+from app.infra.cache import TTLCache
+from app.infra.cache_backends import MemoryBackend, RespBackend
+from app.infra.near_cache import NearCache, listen_invalidations
+
+
+@contextlib.asynccontextmanager
+async def kv_server():
+    kvstore.values.clear()
+    kvstore.channels.clear()
+    server = await asyncio.start_server(kvstore.handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    backend = RespBackend(port=port, timeout=1.0, pool_size=2)
+    try:
+        yield backend
+    finally:
+        await backend.close()
+        server.close()
+
+
+@contextlib.asynccontextmanager
+async def listening(backend, channel):
+    messages: asyncio.Queue = asyncio.Queue()
+    subscribed = asyncio.Event()
+    task = asyncio.create_task(backend.listen(
+        channel,
+        messages.put_nowait,
+        subscribed.set
+    ))
+    await asyncio.wait_for(subscribed.wait(), 1)
+    try:
+        yield messages
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+def test_resp_backend_round_trip():
+    async def scenario():
+        async with kv_server() as backend:
+            await backend.set("users:ana", b"true", 60)
+            assert await backend.get("users:ana") == b"true"
+            await backend.delete("users:ana")
+            assert await backend.get("users:ana") is None
+            await backend.set("users:ana", b"true", 0.001)
+            await asyncio.sleep(0.01)
+            assert await backend.get("users:ana") is None
+
+    asyncio.run(scenario())
+
+
+def test_resp_backend_raises_error_replies():
+    async def scenario():
+        async with kv_server() as backend:
+            with pytest.raises(CacheBackendError):
+                await backend.execute("FLUSHALL")
+            assert await backend.execute("PING") == "PONG"
+
+    asyncio.run(scenario())
+
+
+def test_near_cache_falls_back_to_local_when_backend_is_down():
+    async def scenario():
+        async with kv_server() as backend:
+            pass
+        cache = NearCache(TTLCache("users"), backend)
+        await cache.set("ana", True)
+        assert await cache.get("ana") is True
+        assert await cache.get("bob") is None
+
+    asyncio.run(scenario())
+
+
+def test_published_invalidations_reach_listeners():
+    async def scenario():
+        async with kv_server() as backend:
+            async with listening(backend, "invalidations") as messages:
+                await backend.publish("invalidations", "users:ana")
+                message = await asyncio.wait_for(messages.get(), 1)
+            assert message == "users:ana"
+
+    asyncio.run(scenario())
+
+
+def test_listener_survives_unexpected_replies():
+    async def scenario():
+        async with kv_server() as backend:
+            async with listening(backend, "invalidations") as messages:
+                for writer in kvstore.channels[b"invalidations"]:
+                    writer.write(b":1\r\n*1\r\n$4\r\nnope\r\n")
+                await backend.publish("invalidations", "users:ana")
+                message = await asyncio.wait_for(messages.get(), 1)
+            assert message == "users:ana"
+
+    asyncio.run(scenario())
+
+
+def test_invalidation_drops_local_copies_of_other_replicas():
+    async def scenario():
+        backend = MemoryBackend()
+        writer = NearCache(TTLCache("users"), backend, "invalidations")
+        reader = NearCache(TTLCache("users"), backend, "invalidations")
+        task = asyncio.create_task(
+            listen_invalidations(backend, "invalidations", [reader])
+        )
+        await asyncio.sleep(0)
+        await writer.set("ana", True)
+        assert await reader.get("ana") is True
+        await writer.invalidate("ana")
+        await asyncio.sleep(0)
+        assert len(reader) == 0
+        assert await reader.get("ana") is None
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+
+
+def test_corrupt_backend_value_is_a_miss():
+    async def scenario():
+        backend = MemoryBackend()
+        cache = NearCache(TTLCache("users"), backend)
+        await backend.set("users:ana", b"\xff{not json", 60)
+        assert await cache.get("ana") is None
+
+    asyncio.run(scenario())
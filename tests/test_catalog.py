@@ -0,0 +1,159 @@
+import time
+import asyncio
+
+import httpx
+import pytest
+
+from app import depends
+from app.infra.catalog import (
+    Catalog,
+    PrefixIndex,
+    build_indexes,
+    tokenize,
+)
+from app.serialization import dumps, loads
+
+
+def product(position: int, title: str, brand: str = "Acme") -> dict:
+    return {
+        "_id": f"64a0c0c0c0c0c0c0c0c0c{position:03d}",
+        "title": title,
+        "list_price": 10.0,
+        "discount_price": 9.0,
+        "image": "item.png",
+        "stock_number": 3,
+        "brand": brand,
+        "product_id": position,
+        "model": f"M-{position}",
+        "sat_key": 1,
+        "weight": 0.5,
+    }
+
+
+PRODUCTS = [
+    product(1, "Cable coaxial"),
+    product(2, "Cámara domo", "Hikvision"),
+    product(3, "Cámara bala", "Dahua"),
+    product(4, "Conector BNC"),
+]
+
+
+def titles(content: bytes):
+    return [doc["title"] for doc in loads(content)]
+
+
+@pytest.fixture
+def index():
+    return PrefixIndex.build(PRODUCTS, ("title", "brand", "model"))
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    catalog = depends.catalog
+    monkeypatch.setattr(catalog, "indexes", build_indexes(PRODUCTS, []))
+    monkeypatch.setattr(catalog, "synced_at", time.monotonic())
+    monkeypatch.setattr(catalog, "changed", asyncio.Event())
+    return catalog
+
+
+def test_tokenize_folds_case_and_accents():
+    assert tokenize("Cámara DOMO-2") == ["camara", "domo", "2"]
+
+
+def test_every_word_must_prefix_an_indexed_word(index):
+    assert titles(index.search("cam", 10)) == ["Cámara domo", "Cámara bala"]
+    assert titles(index.search("cám hik", 10)) == ["Cámara domo"]
+    assert titles(index.search("acme c", 10)) == [
+        "Cable coaxial",
+        "Conector BNC",
+    ]
+    assert index.search("camara acme", 10) == b"[]"
+
+
+def test_results_are_capped(index):
+    assert titles(index.search("", 2)) == ["Cable coaxial", "Cámara domo"]
+    assert titles(index.search("c", 1)) == ["Cable coaxial"]
+
+
+def test_documents_are_encoded_like_responses(index):
+    assert index.search("domo", 10) == b"[" + dumps(PRODUCTS[1]) + b"]"
+    assert "Cámara".encode() in index.search("domo", 10)
+
+
+def test_local_search_skips_the_upstream(client, upstreams, catalog):
+    response = client.get(
+        "/api/v1/products",
+        params={"product_name": "cam"}
+    )
+
+    assert response.status_code == 200
+    assert titles(response.content) == ["Cámara domo", "Cámara bala"]
+    assert upstreams.calls == []
+
+
+def test_invalid_local_answer_falls_back_to_upstream(
+    client,
+    upstreams,
+    catalog,
+    monkeypatch
+):
+    broken = [{**PRODUCTS[0], "stock_number": "many"}]
+    monkeypatch.setattr(catalog, "indexes", build_indexes(broken, []))
+    upstreams.responses["/api/v1/products"] = httpx.Response(
+        200,
+        json=PRODUCTS[:1]
+    )
+
+    response = client.get(
+        "/api/v1/products",
+        params={"product_name": "cable"}
+    )
+
+    assert response.status_code == 200
+    assert titles(response.content) == ["Cable coaxial"]
+    assert len(upstreams.calls) == 1
+
+
+def test_writes_send_searches_upstream_until_resynced(
+    client,
+    upstreams,
+    catalog
+):
+    upstreams.responses["/api/v1/products"] = httpx.Response(
+        201,
+        json=PRODUCTS[0]
+    )
+
+    client.post("/api/v1/products", json=PRODUCTS[0])
+
+    assert not catalog.is_fresh()
+    assert catalog.changed.is_set()
+    resolve = catalog.resolver("products", "product_name")
+    assert resolve({"product_name": "cable"}) is None
+
+
+def test_invalidation_triggers_an_early_sync():
+    fetched = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        fetched.append(request.url.path)
+        return httpx.Response(200, json=PRODUCTS)
+
+    async def scenario():
+        catalog = Catalog("/api/v1/products", "/api/v1/services")
+        client = httpx.AsyncClient(
+            base_url="http://service",
+            transport=httpx.MockTransport(handler)
+        )
+        task = asyncio.create_task(catalog.run(lambda: client, 60))
+        while not catalog.is_fresh():
+            await asyncio.sleep(0.01)
+        catalog.invalidate()
+        assert not catalog.is_fresh()
+        while not catalog.is_fresh():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(asyncio.wait_for(scenario(), 5))
+    assert len(fetched) == 4
@@ -0,0 +1,199 @@
+import gzip
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+from app.compression import (
+    CompressionMiddleware,
+    accepted_encodings,
+    encoded_etag,
+    negotiate,
+)
+from app.config import get_settings
+
+PRODUCT = {
+    "_id": "64a0c0c0c0c0c0c0c0c0c0c2",
+    "title": "Cable",
+    "list_price": 10.0,
+    "discount_price": 9.0,
+    "image": "cable.png",
+    "stock_number": 3,
+    "brand": "Acme",
+    "product_id": 1,
+    "model": "C-1",
+    "sat_key": 1,
+    "weight": 0.5,
+}
+BODY = b'{"items":[' + b",".join(b'{"n":%d}' % i for i in range(300)) + b"]}"
+
+
+def compressed_client(response: Response) -> TestClient:
+    async def endpoint(request):
+        return response
+
+    return TestClient(
+        CompressionMiddleware(Starlette(routes=[Route("/", endpoint)]))
+    )
+
+
+def get(client: TestClient, accept_encoding: str = "gzip") -> httpx.Response:
+    return client.get("/", headers={"Accept-Encoding": accept_encoding})
+
+
+def get_raw(client: TestClient, accept_encoding: str = "gzip"):
+    headers = {"Accept-Encoding": accept_encoding}
+    with client.stream("GET", "/", headers=headers) as response:
+        return response, b"".join(response.iter_raw())
+
+
+def chunks(*parts: bytes):
+    async def body():
+        for part in parts:
+            yield part
+
+    return body()
+
+
+def test_accept_encoding_qualities():
+    assert accepted_encodings("gzip;q=0.5, br, *;q=0") == {
+        "gzip": 0.5,
+        "br": 1.0,
+        "*": 0.0,
+    }
+    assert accepted_encodings("gzip;q=high") == {"gzip": 0.0}
+
+
+@pytest.mark.parametrize("accept_encoding, encoding", [
+    ("gzip, br", "br"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("*", "br"),
+    ("identity", None),
+    ("", None),
+    (None, None),
+])
+def test_negotiation_picks_the_best_shared_coding(accept_encoding, encoding):
+    assert negotiate(accept_encoding) == encoding
+
+
+def test_encoded_etag_adds_the_coding():
+    assert encoded_etag('"abc"', "gzip") == '"abc-gzip"'
+    assert encoded_etag('W/"abc"', "br") == 'W/"abc-br"'
+
+
+def test_small_bodies_are_sent_as_they_are():
+    client = compressed_client(
+        Response(b'{"ok":true}', media_type="application/json")
+    )
+
+    response = get(client)
+
+    assert "content-encoding" not in response.headers
+    assert response.content == b'{"ok":true}'
+
+
+def test_large_bodies_are_compressed():
+    client = compressed_client(
+        Response(
+            BODY,
+            media_type="application/json",
+            headers={"ETag": '"v1"'}
+        )
+    )
+
+    response = get(client)
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == '"v1-gzip"'
+    assert response.content == BODY
+
+
+def test_only_compressible_media_types_are_compressed():
+    client = compressed_client(Response(BODY, media_type="image/png"))
+
+    response = get(client)
+
+    assert "content-encoding" not in response.headers
+
+
+def test_already_encoded_bodies_pass_through():
+    encoded = gzip.compress(BODY)
+    client = compressed_client(Response(
+        encoded,
+        media_type="application/json",
+        headers={"Content-Encoding": "gzip"}
+    ))
+
+    response, content = get_raw(client, "gzip, br")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert content == encoded
+
+
+def test_streamed_bodies_are_compressed_once_over_the_threshold():
+    half = len(BODY) // 2
+    client = compressed_client(StreamingResponse(
+        chunks(BODY[:10], BODY[10:half], BODY[half:]),
+        media_type="application/json"
+    ))
+
+    response, content = get_raw(client)
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(content) == BODY
+
+
+def test_short_streamed_bodies_are_sent_as_they_are():
+    client = compressed_client(StreamingResponse(
+        chunks(b'{"a":', b"1}"),
+        media_type="application/json"
+    ))
+
+    response = get(client)
+
+    assert "content-encoding" not in response.headers
+    assert response.content == b'{"a":1}'
+
+
+def test_cached_representations_have_their_own_etag(
+    client,
+    upstreams,
+    monkeypatch
+):
+    monkeypatch.setattr(get_settings(), "compression_minimum_size", 0)
+    upstreams.responses["/api/v1/products/p1"] = httpx.Response(
+        200,
+        json=PRODUCT
+    )
+    path = "/api/v1/products/p1"
+
+    identity = client.get(path, headers={"Accept-Encoding": "identity"})
+    gzipped = client.get(path, headers={"Accept-Encoding": "gzip"})
+    brotli = client.get(path, headers={"Accept-Encoding": "br"})
+
+    etags = {
+        identity.headers["etag"],
+        gzipped.headers["etag"],
+        brotli.headers["etag"],
+    }
+    assert len(etags) == 3
+    assert gzipped.headers["etag"] == encoded_etag(
+        identity.headers["etag"],
+        "gzip"
+    )
+    revalidated = client.get(path, headers={
+        "Accept-Encoding": "gzip",
+        "If-None-Match": gzipped.headers["etag"],
+    })
+    assert revalidated.status_code == 304
+    changed_coding = client.get(path, headers={
+        "Accept-Encoding": "br",
+        "If-None-Match": gzipped.headers["etag"],
+    })
+    assert changed_coding.status_code == 200
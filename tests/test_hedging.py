@@ -0,0 +1,115 @@
+import asyncio
+
+import httpx
+
+from app.infra.hedging import Hedger, RetryBudget
+
+
+def primed(budget: RetryBudget) -> Hedger:
+    hedger = Hedger(budget, min_delay=0.01, backoff=0.0)
+    for _ in range(20):
+        hedger.trackers["get_product"].observe(0.01)
+    return hedger
+
+
+def attempts(*delays: float):
+    """Attempt answering the n-th call after ``delays[n]`` seconds"""
+    calls = []
+
+    async def attempt() -> httpx.Response:
+        position = len(calls)
+        calls.append(position)
+        await asyncio.sleep(delays[position])
+        return httpx.Response(200, text=str(position))
+
+    return attempt, calls
+
+
+async def settle(hedger: Hedger):
+    while hedger.background:
+        await asyncio.gather(*hedger.background, return_exceptions=True)
+
+
+def test_hedge_wins_over_a_slow_attempt():
+    async def scenario():
+        hedger = primed(RetryBudget())
+        attempt, calls = attempts(0.3, 0.0)
+        response = await hedger.call("get_product", attempt, hedge=True)
+        assert hedger.background
+        await settle(hedger)
+        return response, calls
+
+    response, calls = asyncio.run(scenario())
+
+    assert response.text == "1"
+    assert calls == [0, 1]
+
+
+def test_hedge_loses_to_the_first_attempt():
+    async def scenario():
+        hedger = primed(RetryBudget())
+        attempt, calls = attempts(0.03, 0.3)
+        response = await hedger.call("get_product", attempt, hedge=True)
+        await settle(hedger)
+        return response, calls
+
+    response, calls = asyncio.run(scenario())
+
+    assert response.text == "0"
+    assert calls == [0, 1]
+
+
+def test_no_hedge_without_budget():
+    async def scenario():
+        hedger = primed(RetryBudget(ratio=0.0, tokens=0.0))
+        attempt, calls = attempts(0.03)
+        response = await hedger.call("get_product", attempt, hedge=True)
+        return response, calls
+
+    response, calls = asyncio.run(scenario())
+
+    assert response.text == "0"
+    assert calls == [0]
+
+
+def test_retries_stop_when_the_budget_runs_out():
+    calls = []
+
+    async def unavailable() -> httpx.Response:
+        calls.append(1)
+        return httpx.Response(503)
+
+    budget = RetryBudget(ratio=0.0, tokens=2.0)
+    hedger = Hedger(budget, backoff=0.0)
+    response = asyncio.run(
+        hedger.call("get_product", unavailable, retries=5)
+    )
+
+    assert response.status_code == 503
+    assert len(calls) == 3
+    assert budget.tokens == 0
+
+
+def test_retry_recovers_from_a_transport_error():
+    calls = []
+
+    async def flaky() -> httpx.Response:
+        calls.append(1)
+        if len(calls) == 1:
+            raise httpx.ConnectError("refused")
+        return httpx.Response(200)
+
+    hedger = Hedger(RetryBudget(), backoff=0.0)
+    response = asyncio.run(hedger.call("get_product", flaky, retries=1))
+
+    assert response.status_code == 200
+    assert len(calls) == 2
+
+
+def test_budget_deposits_are_capped():
+    budget = RetryBudget(ratio=0.5, capacity=1.0, tokens=0.0)
+    for _ in range(10):
+        budget.deposit()
+
+    assert budget.withdraw()
+    assert not budget.withdraw()
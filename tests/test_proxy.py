@@ -0,0 +1,105 @@
+import httpx
+import pytest
+
+
+@pytest.mark.parametrize("ids", [
+    ["../../../internal/admin"],
+    ["x?debug=1"],
+    ["x#fragment"],
+    ["ok", "a/b"],
+])
+def test_batch_get_rejects_ids_leaving_their_segment(client, upstreams, ids):
+    response = client.post("/api/v1/products:batchGet", json={"ids": ids})
+
+    assert response.status_code == 422
+    assert upstreams.calls == []
+
+
+def test_batch_get_query_rejects_traversal(client, upstreams):
+    response = client.get(
+        "/api/v1/products:batchGet",
+        params={"ids": ["../../internal/admin"]}
+    )
+
+    assert response.status_code == 422
+    assert upstreams.calls == []
+
+
+def test_batch_get_fetches_each_id_from_its_route(client, upstreams):
+    response = client.post(
+        "/api/v1/products:batchGet",
+        json={"ids": ["a1", "b2"]}
+    )
+
+    assert response.status_code == 200
+    assert [call.url.path for call in upstreams.calls] == [
+        "/api/v1/products/a1",
+        "/api/v1/products/b2",
+    ]
+    assert set(response.json()["errors"]) == {"a1", "b2"}
+
+
+PRODUCT = {
+    "_id": "64a0c0c0c0c0c0c0c0c0c0c2",
+    "title": "Cable",
+    "list_price": 10.0,
+    "discount_price": 9.0,
+    "image": "cable.png",
+    "stock_number": 3,
+    "brand": "Acme",
+    "product_id": 1,
+    "model": "C-1",
+    "sat_key": 1,
+    "weight": 0.5,
+}
+
+
+def test_batch_get_reports_invalid_documents_per_id(client, upstreams):
+    upstreams.responses.update({
+        "/api/v1/products/good": httpx.Response(200, json=PRODUCT),
+        "/api/v1/products/drift": httpx.Response(200, json={"title": 1}),
+        "/api/v1/products/text": httpx.Response(200, content=b"<html>"),
+    })
+
+    response = client.post(
+        "/api/v1/products:batchGet",
+        json={"ids": ["good", "drift", "text"]}
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["items"][0]["title"] == "Cable"
+    assert body["items"][1:] == [None, None]
+    assert {
+        id_: error["status_code"] for id_, error in body["errors"].items()
+    } == {"drift": 502, "text": 502}
+
+
+def test_create_product_forwards_patch_upstream(client, upstreams):
+    upstreams.responses["/api/v1/products"] = httpx.Response(
+        201,
+        json=PRODUCT
+    )
+
+    response = client.post("/api/v1/products", json=PRODUCT)
+
+    assert response.status_code == 201
+    assert [
+        (call.method, call.url.path) for call in upstreams.calls
+    ] == [("PATCH", "/api/v1/products")]
+
+
+def test_uncached_304_is_not_stored(client, upstreams):
+    upstreams.responses["/api/v1/products/p1"] = httpx.Response(304)
+
+    first = client.get("/api/v1/products/p1")
+    upstreams.responses["/api/v1/products/p1"] = httpx.Response(
+        200,
+        json=PRODUCT
+    )
+    second = client.get("/api/v1/products/p1")
+
+    assert first.status_code == 304
+    assert second.status_code == 200
+    assert second.json()["title"] == "Cable"
+    assert len(upstreams.calls) == 2
@@ -0,0 +1,37 @@
+import httpx
+import pytest
+
+QUOTER_PATH = "/api/v1/quoters/q1"
+
+
+@pytest.mark.parametrize("response", [
+    httpx.Response(200, content=b""),
+    httpx.Response(204),
+    httpx.Response(200, json=["not", "a", "quoter"]),
+    httpx.Response(200, content=b"<html>"),
+])
+def test_expanded_quoter_rejects_invalid_quoter(client, upstreams, response):
+    upstreams.responses[QUOTER_PATH] = response
+
+    response = client.get(f"{QUOTER_PATH}/expanded")
+
+    assert response.status_code == 502
+
+
+def test_expanded_quoter_keeps_unresolvable_links(client, upstreams):
+    upstreams.responses[QUOTER_PATH] = httpx.Response(200, json={
+        "_id": "q1",
+        "client": "c1",
+        "products": ["p1", {"name": "no id"}],
+        "services": {"_id": "s1"},
+    })
+
+    response = client.get(f"{QUOTER_PATH}/expanded")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["client"] == "c1"
+    assert body["products"] == ["p1", {"name": "no id"}]
+    assert body["services"] == []
+    assert body["errors"] == {}
+    assert [call.url.path for call in upstreams.calls] == [QUOTER_PATH]
@@ -0,0 +1,181 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.config import get_settings
+from app.errors import UpstreamUnavailableError
+from app.infra.resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    UpstreamGuard,
+    UpstreamPolicy,
+    policy_for,
+)
+
+
+def policy(**overrides) -> UpstreamPolicy:
+    values = dict(
+        connect_timeout=1.0,
+        read_timeout=1.0,
+        max_in_flight=10,
+        bulkhead_wait=0.01,
+        failure_threshold=0.5,
+        min_requests=4,
+        window=30.0,
+        slow_call=5.0,
+        open_seconds=30.0,
+    )
+    values.update(overrides)
+    return UpstreamPolicy(**values)
+
+
+def streaming_client() -> httpx.AsyncClient:
+    async def body():
+        yield b"["
+        yield b"]"
+
+    return httpx.AsyncClient(
+        base_url="http://service",
+        transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, content=body())
+        )
+    )
+
+
+def test_policy_overrides_keep_field_types(monkeypatch):
+    conf = get_settings()
+    monkeypatch.setattr(
+        conf,
+        "upstream_policies",
+        {"service": {"max_in_flight": 2.0, "read_timeout": 1}}
+    )
+
+    policy = policy_for(conf, "service")
+
+    assert policy.max_in_flight == 2
+    assert isinstance(policy.max_in_flight, int)
+    assert isinstance(policy.read_timeout, float)
+
+
+def test_streamed_response_holds_its_slot_until_closed(monkeypatch):
+    conf = get_settings()
+    monkeypatch.setattr(
+        conf,
+        "upstream_policies",
+        {"service": {"max_in_flight": 1, "bulkhead_wait": 0.01}}
+    )
+
+    async def scenario():
+        guard = UpstreamGuard("service", policy_for(conf, "service"))
+        client = streaming_client()
+
+        def call():
+            return client.send(client.build_request("GET", "/"), stream=True)
+
+        response = await guard.run(call, hold=True)
+        with pytest.raises(UpstreamUnavailableError):
+            await guard.run(call, hold=True)
+        assert await response.aread() == b"[]"
+        await response.aclose()
+        second = await guard.run(call, hold=True)
+        await second.aclose()
+        assert guard.breaker.calls[-1][1] is True
+
+    asyncio.run(scenario())
+
+
+def test_breaker_opens_probes_and_closes():
+    breaker = CircuitBreaker("service", policy())
+    for success in (True, False, True):
+        breaker.record(success)
+    assert breaker.state == CLOSED
+
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+    breaker.opened_at -= 30
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record(True)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_opens_the_breaker_again():
+    breaker = CircuitBreaker("service", policy(min_requests=1))
+    breaker.record(False)
+    breaker.opened_at -= 30
+    assert breaker.allow()
+
+    breaker.record(False)
+
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_open_circuit_rejects_without_calling():
+    calls = []
+
+    async def call():
+        calls.append(1)
+
+    async def scenario():
+        guard = UpstreamGuard("service", policy(min_requests=1))
+        guard.breaker.record(False)
+        with pytest.raises(UpstreamUnavailableError):
+            await guard.run(call)
+
+    asyncio.run(scenario())
+    assert calls == []
+
+
+def test_bulkhead_rejects_calls_over_max_in_flight():
+    async def scenario():
+        guard = UpstreamGuard("service", policy(max_in_flight=1))
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return httpx.Response(200)
+
+        async def fast():
+            return httpx.Response(200)
+
+        running = asyncio.create_task(guard.run(slow))
+        await asyncio.sleep(0)
+        with pytest.raises(UpstreamUnavailableError):
+            await guard.run(fast)
+        release.set()
+        assert (await running).status_code == 200
+        assert (await guard.run(fast)).status_code == 200
+
+    asyncio.run(scenario())
+
+
+def test_errors_and_slow_calls_count_as_failures():
+    async def scenario():
+        guard = UpstreamGuard("service", policy(slow_call=0.01))
+
+        async def failing():
+            raise httpx.ConnectError("refused")
+
+        async def erroring():
+            return httpx.Response(503)
+
+        async def slow():
+            await asyncio.sleep(0.02)
+            return httpx.Response(200)
+
+        with pytest.raises(httpx.ConnectError):
+            await guard.run(failing)
+        await guard.run(erroring)
+        await guard.run(slow)
+        return [ok for _, ok in guard.breaker.calls]
+
+    assert asyncio.run(scenario()) == [False, False, False]
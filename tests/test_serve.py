@@ -0,0 +1,31 @@
+import pytest
+
+from app import main
+from app.metrics import MULTIPROC_DIR
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    runs = []
+    monkeypatch.setattr(main.uvicorn, "run", lambda *a, **kw: runs.append(kw))
+    monkeypatch.setattr(main.conf, "workers", 2)
+    return runs
+
+
+def test_workers_share_a_fresh_metrics_directory(runs, monkeypatch, tmp_path):
+    monkeypatch.setenv(MULTIPROC_DIR, str(tmp_path))
+    leftover = tmp_path / "counter_1.db"
+    leftover.write_bytes(b"old")
+
+    main.serve()
+
+    assert runs[0]["workers"] == 2
+    assert not leftover.exists()
+
+
+def test_profiling_requires_a_single_worker(runs, monkeypatch):
+    monkeypatch.setattr(main.conf, "profiling_enabled", True)
+
+    with pytest.raises(ValueError):
+        main.serve()
+    assert runs == []
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from app.infra.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def scenario():
+        flights = SingleFlight()
+        results = await asyncio.gather(
+            *(flights.do("key", call) for _ in range(5))
+        )
+        assert flights.flights == {}
+        return results
+
+    assert asyncio.run(scenario()) == ["result"] * 5
+    assert len(calls) == 1
+
+
+def test_error_reaches_every_waiter():
+    async def call():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream broke")
+
+    async def scenario():
+        flights = SingleFlight()
+        return await asyncio.gather(
+            *(flights.do("key", call) for _ in range(3)),
+            return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+
+    assert len(results) == 3
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_cancelled_waiter_leaves_the_shared_call_running():
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "result"
+
+    async def scenario():
+        flights = SingleFlight()
+        leaving = asyncio.create_task(flights.do("key", call))
+        staying = asyncio.create_task(flights.do("key", call))
+        await asyncio.sleep(0)
+        leaving.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leaving
+        return await staying
+
+    assert asyncio.run(scenario()) == "result"
+    assert len(calls) == 1
+
+
+def test_last_waiter_leaving_cancels_the_call():
+    finished = []
+
+    async def call():
+        await asyncio.sleep(0.05)
+        finished.append(1)
+
+    async def scenario():
+        flights = SingleFlight()
+        waiter = asyncio.create_task(flights.do("key", call))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        await asyncio.sleep(0.1)
+        assert flights.flights == {}
+
+    asyncio.run(scenario())
+    assert finished == []
@@ -0,0 +1,47 @@
+import asyncio
+import hashlib
+import time
+
+import pytest
+from jose import JWTError, jwt
+
+from app.infra.repository import ACCESS
+
+
+def digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).digest().hex()
+
+
+def test_cached_claims_are_rejected_after_exp(repo, monkeypatch):
+    token = repo.encode_token("ana", ACCESS, 60)
+    claims = asyncio.run(repo.decode_token(token))
+    later = claims["exp"] + 1
+    monkeypatch.setattr(time, "time", lambda: later)
+
+    with pytest.raises(jwt.ExpiredSignatureError):
+        asyncio.run(repo.decode_token(token))
+    assert len(repo.token_cache) == 0
+
+
+def test_tampered_token_is_verified_again(repo):
+    token = repo.encode_token("ana", ACCESS, 60)
+    asyncio.run(repo.decode_token(token))
+    header, _, signature = token.split(".")
+    claims = jwt.get_unverified_claims(token)
+    claims["sub"] = "admin"
+    payload = jwt.encode(claims, "other", algorithm="HS256").split(".")[1]
+    tampered = ".".join((header, payload, signature))
+
+    with pytest.raises(JWTError):
+        asyncio.run(repo.decode_token(tampered))
+    assert len(repo.token_cache) == 1
+
+
+def test_cache_ttl_is_capped_at_exp(repo):
+    token = repo.encode_token("ana", ACCESS, 30)
+    asyncio.run(repo.decode_token(token))
+
+    _, expires_at = repo.token_cache.local.entries[digest(token)]
+
+    assert repo.token_cache.ttl > 30
+    assert expires_at - time.monotonic() <= 30
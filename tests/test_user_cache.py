@@ -0,0 +1,98 @@
+import time
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.adapters.gateway import Gateway
+from app.config import get_settings
+from app.depends import get_gateway
+from app.errors import DBError, UserNotFoundException
+from app.infra.cache import TTLCache
+from app.infra.near_cache import NearCache
+
+
+def lookups(cache: str, result: str) -> float:
+    return REGISTRY.get_sample_value(
+        "gateway_cache_requests_total",
+        {"cache": cache, "result": result}
+    ) or 0.0
+
+
+@pytest.fixture
+def cache():
+    return NearCache(TTLCache(
+        f"users-{time.monotonic_ns()}",
+        ttl=60,
+        stale_ttl=300
+    ))
+
+
+@pytest.fixture
+def gateway(repo, cache):
+    return Gateway(repo, user_cache=cache)
+
+
+def test_known_users_are_served_from_the_cache(gateway, repo, cache):
+    for _ in range(3):
+        assert asyncio.run(gateway.check_user("ana")) == "ana"
+
+    assert repo.lookups == 1
+    assert (cache.local.hits, cache.local.misses) == (2, 1)
+    assert lookups(cache.name, "hit") == 2
+    assert lookups(cache.name, "miss") == 1
+
+
+def test_expired_user_is_served_stale_while_the_db_is_down(
+    gateway,
+    repo,
+    cache
+):
+    asyncio.run(gateway.check_user("ana"))
+    cache.local.entries["ana"] = (True, time.monotonic() - 1)
+    repo.available = False
+
+    assert asyncio.run(gateway.check_user("ana")) == "ana"
+    assert repo.lookups == 2
+    assert lookups(cache.name, "stale") == 1
+
+
+def test_unknown_user_is_not_served_while_the_db_is_down(gateway, repo):
+    repo.available = False
+
+    with pytest.raises(DBError):
+        asyncio.run(gateway.check_user("ana"))
+
+
+def test_invalidated_user_is_checked_again(gateway, repo):
+    asyncio.run(gateway.check_user("ana"))
+    del repo.users["ana"]
+
+    asyncio.run(gateway.invalidate_user("ana"))
+
+    with pytest.raises(UserNotFoundException):
+        asyncio.run(gateway.check_user("ana"))
+
+
+def test_admins_can_invalidate_cached_users(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "profiling_admins", ["tester"])
+    calls = []
+
+    class RecordingGateway:
+        async def invalidate_user(self, username: str):
+            calls.append(username)
+
+    client.app.dependency_overrides[get_gateway] = RecordingGateway
+
+    response = client.delete("/api/v1/admin/users/ana/cache")
+
+    assert response.status_code == 204
+    assert calls == ["ana"]
+
+
+def test_only_admins_can_invalidate_cached_users(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "profiling_admins", [])
+
+    response = client.delete("/api/v1/admin/users/ana/cache")
+
+    assert response.status_code == 403